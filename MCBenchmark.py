@@ -0,0 +1,153 @@
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Iterable, Tuple
+from MCProblem import RULES_VERSION, np
+from MCSolution import ALGORITHMS, MCSolution
+
+# version of the benchmark file format
+BENCHMARK_VERSION = 1
+
+# sizes measured by default, as (groupSize, boatCapacity). IDA* and SMA* grow exponentially with the group size
+DEFAULT_SIZES = [(3, 2), (5, 3), (10, 4)]
+
+def timingStatistics(samples: list[int]) -> dict[str, float]:
+    ''' Returns the median, the interquartile range, the minimum and the maximum of the times, in nanoseconds '''
+    if len(samples) > 1:
+        lower, _, upper = statistics.quantiles(samples, n=4, method='inclusive')
+    else:
+        lower = upper = samples[0]
+    return {'medianNs': statistics.median(samples), 'iqrNs': upper - lower, 'minNs': min(samples), 'maxNs': max(samples)}
+
+def benchmarkConfiguration(groupSize: int, boatCapacity: int, algorithm: str, warmup: int = 2, repeats: int = 10,
+                           nodeBudget: int = 100000, memory: bool = True) -> dict[str, Any]:
+    ''' Measures the algorithm on a single configuration and returns its row.
+        The warmup runs build the state graph and the shared states, which all the algorithms reuse,
+        and are not measured. Each measured run starts with an empty neighbors cache, and its time is
+        the search plus the path reconstruction, measured by perf_counter_ns, without printing.
+        The peak memory is measured by one more run under tracemalloc, which is not timed. '''
+
+    solution = MCSolution(groupSize, boatCapacity)
+    row: dict[str, Any] = {'groupSize': groupSize, 'boatCapacity': boatCapacity, 'algorithm': algorithm,
+                           'solvable': solution.problem.isSolvable()}
+    if not row['solvable']:
+        return row
+
+    for _ in range(warmup):
+        solution.problem.reset()
+        solution.runAlgorithm(algorithm, nodeBudget)
+
+    samples: list[int] = []
+    for _ in range(repeats):
+        solution.problem.reset()
+        result = solution.runAlgorithm(algorithm, nodeBudget)
+        samples.append(result.searchNs + result.pathNs)
+
+    row.update({'found': result.found, 'steps': result.pathLength, 'expanded': result.expanded, 'generated': result.generated,
+                'repeats': repeats, 'samplesNs': samples})
+    row.update(timingStatistics(samples))
+    row['statesPerSecond'] = result.expanded * 10**9 / row['medianNs'] if row['medianNs'] else 0.00
+
+    if memory:
+        profile = solution.profileMemory(algorithm, nodeBudget).memory
+        assert profile is not None
+        row.update({'peakBytes': profile.peakBytes, 'bytesPerExpanded': profile.bytesPerExpanded})
+    return row
+
+def runBenchmark(sizes: Iterable[Tuple[int, int]], algorithms: Iterable[str], warmup: int = 2, repeats: int = 10,
+                 nodeBudget: int = 100000, memory: bool = True, verbose: bool = True) -> dict[str, Any]:
+    ''' Measures every algorithm on every size and returns the benchmark, with the environment it ran on '''
+    if repeats < 1:
+        raise ValueError("The benchmark needs at least 1 repeat")
+
+    benchmark: dict[str, Any] = {
+        'version': BENCHMARK_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'numpy': np is not None,
+        'rulesVersion': RULES_VERSION,
+        'warmup': warmup,
+        'repeats': repeats,
+        'results': []
+    }
+    for groupSize, boatCapacity in sizes:
+        for algorithm in algorithms:
+            row = benchmarkConfiguration(groupSize, boatCapacity, algorithm.lower(), warmup, repeats, nodeBudget, memory)
+            benchmark['results'].append(row)
+            if verbose:
+                print(describeRow(row))
+    return benchmark
+
+def describeRow(row: dict[str, Any]) -> str:
+    ''' Returns the summary line of a benchmark row '''
+    name = f"{row['algorithm'].upper()} ({row['groupSize']}, {row['boatCapacity']})"
+    if not row['solvable']:
+        return f"{name} - sem solução"
+    line = (f"{name} - mediana {row['medianNs'] / 10**6:.3f} ms - IQR {row['iqrNs'] / 10**6:.3f} ms - "
+            f"mínimo {row['minNs'] / 10**6:.3f} ms - {row['statesPerSecond']:.0f} estados/s")
+    if 'peakBytes' in row:
+        line += f" - pico {row['peakBytes']} bytes"
+    return line
+
+def compareBenchmarks(baseline: dict[str, Any], current: dict[str, Any], threshold: float = 0.10) -> list[str]:
+    ''' Returns the regressions of the current benchmark against the baseline.
+        A configuration regressed when its median time is more than threshold above the baseline median
+        and even its fastest run is slower than the baseline median, so the noise of a few slow runs is ignored. '''
+
+    def key(row: dict[str, Any]) -> Tuple[int, int, str]:
+        return (row['groupSize'], row['boatCapacity'], row['algorithm'])
+
+    previous = {key(row): row for row in baseline['results'] if 'medianNs' in row}
+    regressions: list[str] = []
+    for row in current['results']:
+        old = previous.get(key(row))
+        if old is None or 'medianNs' not in row:
+            continue
+        if row['medianNs'] > old['medianNs'] * (1 + threshold) and row['minNs'] > old['medianNs']:
+            regressions.append(f"{row['algorithm'].upper()} ({row['groupSize']}, {row['boatCapacity']}) - "
+                               f"mediana de {old['medianNs'] / 10**6:.3f} ms para {row['medianNs'] / 10**6:.3f} ms "
+                               f"({row['medianNs'] / old['medianNs'] - 1:+.0%})")
+    return regressions
+
+def parseSizes(text: str) -> list[Tuple[int, int]]:
+    ''' Parses a list of sizes, given as "groupSize x boatCapacity" pairs, like "3x2,5x3,10x4" '''
+    sizes: list[Tuple[int, int]] = []
+    for part in text.split(','):
+        groupSize, boatCapacity = part.lower().split('x')
+        sizes.append((int(groupSize), int(boatCapacity)))
+    return sizes
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos algoritmos de busca do problema dos missionários e canibais")
+    parser.add_argument('--sizes', type=parseSizes, default=DEFAULT_SIZES, help="tamanhos, como 3x2,5x3,10x4")
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, help="algoritmos")
+    parser.add_argument('--warmup', type=int, default=2, help="execuções de aquecimento, não medidas")
+    parser.add_argument('--repeats', type=int, default=10, help="execuções medidas")
+    parser.add_argument('--node-budget', type=int, default=100000, help="limite de nós do SMA*")
+    parser.add_argument('--no-memory', action='store_true', help="não mede o pico de memória")
+    parser.add_argument('--output', default='benchmark.json', help="arquivo JSON de saída")
+    parser.add_argument('--compare', help="arquivo JSON de um benchmark anterior, para detectar regressões")
+    parser.add_argument('--threshold', type=float, default=0.10, help="aumento da mediana considerado regressão")
+    args = parser.parse_args()
+
+    benchmark = runBenchmark(args.sizes, args.algorithms, args.warmup, args.repeats, args.node_budget, not args.no_memory)
+    with open(args.output, 'w') as file:
+        json.dump(benchmark, file, indent=2)
+    print(f"Resultados gravados em {args.output}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compareBenchmarks(json.load(file), benchmark, args.threshold)
+        for regression in regressions:
+            print(f"Regressão: {regression}")
+        if regressions:
+            sys.exit(1)
+        print("Nenhuma regressão encontrada")
+
+if __name__ == "__main__":
+    main()
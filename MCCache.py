@@ -0,0 +1,132 @@
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Tuple, Union
+from MCProblem import CACHE_DIR, RULES_VERSION, MCProblem, State, Action
+from MCSearch import SearchResult
+
+# version of the database schema, a database created with another version is emptied and recreated
+SOLUTION_CACHE_VERSION = 3
+
+# columns of the primary key, in the order of SolutionCache.key
+KEY_CONDITION = "groupSize = ? AND boatCapacity = ? AND startMargin = ? AND patternDatabase = ? AND nodeBudget = ? AND algorithm = ?"
+
+class SolutionCache():
+    ''' Class that represents the persistent store of solutions, kept in a SQLite database.
+        The solutions are keyed by the problem configuration (including the pattern database),
+        the algorithm and, for SMA*, the node budget. They keep the path, the search statistics and
+        the search times. Entries stored with another RULES_VERSION are stale and ignored. When there are
+        more than maxEntries solutions, the least recently used ones are removed.
+        The connection is shared by all threads, so each operation takes a lock. '''
+    def __init__(self, path: str = os.path.join(CACHE_DIR, 'solutions.sqlite3'), maxEntries: int = 1000) -> None:
+        if (maxEntries < 1):
+            raise ValueError("The cache must hold at least one entry")
+        self.maxEntries = maxEntries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # autocommit with a write-ahead log, so updating the last use of a hit doesn't wait for the disk
+        self.connection = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != SOLUTION_CACHE_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS solutions")
+            self.connection.execute(f"PRAGMA user_version = {SOLUTION_CACHE_VERSION}")
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS solutions (
+                groupSize INTEGER NOT NULL,
+                boatCapacity INTEGER NOT NULL,
+                startMargin TEXT NOT NULL,
+                patternDatabase INTEGER NOT NULL,
+                nodeBudget INTEGER NOT NULL,
+                algorithm TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                states BLOB NOT NULL,
+                moves BLOB NOT NULL,
+                analysed INTEGER NOT NULL,
+                expanded INTEGER NOT NULL,
+                generated INTEGER NOT NULL,
+                duplicates INTEGER NOT NULL,
+                maxFrontier INTEGER NOT NULL,
+                searchNs INTEGER NOT NULL,
+                pathNs INTEGER NOT NULL,
+                lastUsed INTEGER NOT NULL,
+                PRIMARY KEY (groupSize, boatCapacity, startMargin, patternDatabase, nodeBudget, algorithm)
+            )''')
+        self.connection.execute("CREATE INDEX IF NOT EXISTS solutionsLastUsed ON solutions (lastUsed)")
+
+    @staticmethod
+    def key(problem: MCProblem, algorithm: str, nodeBudget: int) -> Tuple[int, int, str, int, int, str]:
+        ''' Returns the primary key of the configuration. Only SMA* depends on the node budget,
+            so the other algorithms are stored with a budget of 0 '''
+        name = algorithm.lower()
+        return (problem.groupSize, problem.boatCapacity, problem.initialState.boat, int(problem.patternDatabase),
+                nodeBudget if name == 'sma*' else 0, name)
+
+    def get(self, problem: MCProblem, algorithm: str, nodeBudget: int = 0) -> SearchResult | None:
+        ''' Returns the SearchResult stored for the problem configuration, algorithm and node budget,
+            or None when there is no valid entry. The path has the shared states of the problem, with their heuristic,
+            and the result has the statistics and the times of the original search, and the time of the lookup in cacheNs '''
+
+        start = time.perf_counter_ns()
+        key = self.key(problem, algorithm, nodeBudget)
+        with self.lock:
+            row = self.connection.execute(f'''
+                SELECT version, states, moves, analysed, expanded, generated, duplicates, maxFrontier, searchNs, pathNs
+                FROM solutions WHERE {KEY_CONDITION}''', key).fetchone()
+
+            if row is None or row[0] != RULES_VERSION:
+                if row is not None:
+                    # the entry was stored by other problem rules
+                    self.connection.execute(f"DELETE FROM solutions WHERE {KEY_CONDITION}", key)
+                self.misses += 1
+                return None
+
+            self.connection.execute(f"UPDATE solutions SET lastUsed = ? WHERE {KEY_CONDITION}", (time.time_ns(),) + key)
+            self.hits += 1
+
+        states = array('q')
+        states.frombytes(row[1])
+        moves = array(problem.moveTypecode)
+        moves.frombytes(row[2])
+        path: list[Tuple[State, Union[Action, None]]] = [
+            (problem.internState(id), problem.moveList[move]) for id, move in zip(states, moves)]
+        analysed, expanded, generated, duplicates, maxFrontier, searchNs, pathNs = row[3:]
+        return SearchResult(key[-1], True, path, analysed=analysed, expanded=expanded, generated=generated,
+                            duplicates=duplicates, maxFrontier=maxFrontier, searchNs=searchNs, pathNs=pathNs,
+                            cacheHit=True, cacheNs=time.perf_counter_ns() - start)
+
+    def put(self, problem: MCProblem, algorithm: str, result: SearchResult, nodeBudget: int = 0) -> None:
+        ''' Stores the path, the statistics and the times of the search result for the problem configuration,
+            algorithm and node budget, removing the least recently used entries over maxEntries '''
+
+        states = array('q', (state.id for state, _ in result.path))
+        moves = array(problem.moveTypecode, (problem.moveIds[action] for _, action in result.path if action is not None))
+        if len(moves) != len(states):
+            raise ValueError("Every step of the path needs an action")
+
+        with self.lock:
+            self.connection.execute('''
+                INSERT OR REPLACE INTO solutions
+                (groupSize, boatCapacity, startMargin, patternDatabase, nodeBudget, algorithm, version, states, moves,
+                 analysed, expanded, generated, duplicates, maxFrontier, searchNs, pathNs, lastUsed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                self.key(problem, algorithm, nodeBudget) +
+                (RULES_VERSION, states.tobytes(), moves.tobytes(), result.analysed, result.expanded, result.generated,
+                 result.duplicates, result.maxFrontier, result.searchNs, result.pathNs, time.time_ns()))
+            self.connection.execute('''
+                DELETE FROM solutions WHERE rowid IN (
+                    SELECT rowid FROM solutions ORDER BY lastUsed DESC LIMIT -1 OFFSET ?)''', (self.maxEntries,))
+
+    def clear(self) -> None:
+        ''' Removes all the stored solutions '''
+        with self.lock:
+            self.connection.execute("DELETE FROM solutions")
+
+    def close(self) -> None:
+        self.connection.close()
@@ -0,0 +1,227 @@
+import gc
+import sys
+import time
+import tracemalloc
+from typing import Iterable, TextIO, Tuple
+from MCProblem import Action, MCProblem, Node, State
+from MCSearch import MemoryNode, MemoryProfile, SearchResult
+
+class SearchListener():
+    ''' Base class of the listeners of the search events.
+        The algorithms report the events at fixed points of their loops:
+        expand, when a state is expanded, with its depth and the size of the frontier at that moment,
+        generate, for each successor of the expanded state,
+        duplicate, when a successor is discarded because its state was already reached,
+        goal, when the solution is found, and finish, with the SearchResult of the run.
+        All the methods do nothing, so a listener only overrides the events it needs. '''
+
+    def onExpand(self, state: State, depth: int, frontierSize: int) -> None:
+        pass
+
+    def onGenerate(self, state: State, depth: int) -> None:
+        pass
+
+    def onDuplicate(self, state: State, depth: int) -> None:
+        pass
+
+    def onGoal(self, state: State, depth: int) -> None:
+        pass
+
+    def onFinish(self, result: SearchResult) -> None:
+        pass
+
+class SearchHooks():
+    ''' Class that dispatches the search events to the listeners.
+        The algorithms keep it in a local variable, which is None when no listener is attached,
+        so a disabled search only tests that variable and never calls a function per node. '''
+    def __init__(self) -> None:
+        self.listeners: list[SearchListener] = []
+
+    def expand(self, state: State, depth: int, frontierSize: int, neighbors: Iterable[Tuple[State, Action]] = ()) -> None:
+        ''' Reports the expansion of the state, and the generation of each of the neighbors, when they are
+            given as a list. The searches that iterate the neighbors lazily report each one with generate '''
+        for listener in self.listeners:
+            listener.onExpand(state, depth, frontierSize)
+            for neighborState, _ in neighbors:
+                listener.onGenerate(neighborState, depth + 1)
+
+    def generate(self, state: State, depth: int) -> None:
+        for listener in self.listeners:
+            listener.onGenerate(state, depth)
+
+    def duplicate(self, state: State, depth: int) -> None:
+        for listener in self.listeners:
+            listener.onDuplicate(state, depth)
+
+    def goal(self, state: State, depth: int) -> None:
+        for listener in self.listeners:
+            listener.onGoal(state, depth)
+
+    def finish(self, result: SearchResult) -> None:
+        for listener in self.listeners:
+            listener.onFinish(result)
+
+class CounterListener(SearchListener):
+    ''' Counts the events of the searches, and measures the expansion rate of the last one '''
+    def __init__(self) -> None:
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.goals = 0
+        self.maxFrontier = 0
+        self.searchNs = 0
+
+    def onExpand(self, state: State, depth: int, frontierSize: int) -> None:
+        self.expanded += 1
+        if frontierSize > self.maxFrontier: self.maxFrontier = frontierSize
+
+    def onGenerate(self, state: State, depth: int) -> None:
+        self.generated += 1
+
+    def onDuplicate(self, state: State, depth: int) -> None:
+        self.duplicates += 1
+
+    def onGoal(self, state: State, depth: int) -> None:
+        self.goals += 1
+
+    def onFinish(self, result: SearchResult) -> None:
+        self.searchNs += result.searchNs
+
+    @property
+    def branchingFactor(self) -> float:
+        ''' Returns the average number of successors of the expanded states '''
+        return self.generated / self.expanded if self.expanded else 0.00
+
+    @property
+    def expansionRate(self) -> float:
+        ''' Returns the number of expanded states per second '''
+        return self.expanded * 10**9 / self.searchNs if self.searchNs else 0.00
+
+class DepthHistogramListener(SearchListener):
+    ''' Counts the expanded, generated and duplicate states at each depth of the search,
+        and the largest frontier seen while expanding each depth '''
+    def __init__(self) -> None:
+        self.expanded: list[int] = []
+        self.generated: list[int] = []
+        self.duplicates: list[int] = []
+        self.frontier: list[int] = []
+
+    @staticmethod
+    def count(histogram: list[int], depth: int) -> None:
+        while len(histogram) <= depth:
+            histogram.append(0)
+        histogram[depth] += 1
+
+    def onExpand(self, state: State, depth: int, frontierSize: int) -> None:
+        self.count(self.expanded, depth)
+        while len(self.frontier) <= depth:
+            self.frontier.append(0)
+        if frontierSize > self.frontier[depth]: self.frontier[depth] = frontierSize
+
+    def onGenerate(self, state: State, depth: int) -> None:
+        self.count(self.generated, depth)
+
+    def onDuplicate(self, state: State, depth: int) -> None:
+        self.count(self.duplicates, depth)
+
+    def branchingFactor(self, depth: int) -> float:
+        ''' Returns the average number of successors of the states expanded at the depth '''
+        expanded = self.expanded[depth] if depth < len(self.expanded) else 0
+        generated = self.generated[depth + 1] if depth + 1 < len(self.generated) else 0
+        return generated / expanded if expanded else 0.00
+
+    def describe(self) -> str:
+        ''' Returns a table with the histograms, one line per depth '''
+        lines = ["profundidade  expandidos  gerados  duplicados  fronteira  ramificação"]
+        for depth in range(max(len(self.expanded), len(self.generated), len(self.duplicates))):
+            expanded = self.expanded[depth] if depth < len(self.expanded) else 0
+            generated = self.generated[depth] if depth < len(self.generated) else 0
+            duplicates = self.duplicates[depth] if depth < len(self.duplicates) else 0
+            frontier = self.frontier[depth] if depth < len(self.frontier) else 0
+            lines.append(f"{depth:12}  {expanded:10}  {generated:7}  {duplicates:10}  {frontier:9}  {self.branchingFactor(depth):11.2f}")
+        return "\n".join(lines)
+
+class ProgressListener(SearchListener):
+    ''' Prints the progress of a long search once every interval expanded states.
+        Only the sampled expansions read the clock, so the listener stays cheap between samples '''
+    def __init__(self, interval: int = 10000, stream: TextIO | None = None) -> None:
+        if interval < 1:
+            raise ValueError("The interval has to be greater than 0")
+        self.interval = interval
+        self.stream = stream
+        self.expanded = 0
+        self.generated = 0
+        self.start = time.perf_counter_ns()
+
+    def onExpand(self, state: State, depth: int, frontierSize: int) -> None:
+        if self.expanded == 0:
+            self.start = time.perf_counter_ns()
+        self.expanded += 1
+        if self.expanded % self.interval == 0:
+            elapsedNs = time.perf_counter_ns() - self.start
+            rate = self.expanded * 10**9 / elapsedNs if elapsedNs else 0.00
+            print(f"{self.expanded} expandidos - {self.generated} gerados - {rate:.0f} estados/s - "
+                  f"profundidade {depth} - fronteira {frontierSize}", file=self.stream or sys.stdout)
+
+    def onGenerate(self, state: State, depth: int) -> None:
+        self.generated += 1
+
+    def onFinish(self, result: SearchResult) -> None:
+        self.expanded = 0
+        self.generated = 0
+
+class MemoryListener(SearchListener):
+    ''' Samples the memory traced by tracemalloc once every interval expanded states, and takes a census
+        of the live Node, State and Action objects and of the neighbors cache whenever the memory grew
+        more than 10% since the last census. tracemalloc has to be tracing during the search.
+        The census walks all the objects tracked by the garbage collector, which include the ones of the rest
+        of the process, so a first census is taken when the listener is created and the profile keeps the
+        difference from it. The censuses are kept out of the peak '''
+    names = {Node: 'Node', MemoryNode: 'Node', State: 'State', Action: 'Action'}
+
+    def __init__(self, problem: MCProblem, interval: int = 1000) -> None:
+        if interval < 1:
+            raise ValueError("The interval has to be greater than 0")
+        self.problem = problem
+        self.interval = interval
+        self.baselineCounts, self.baselineSizes = self.census()
+        self.profile = MemoryProfile(tracemalloc.get_traced_memory()[0])
+        self.peak = 0
+        tracemalloc.reset_peak()
+
+    def onExpand(self, state: State, depth: int, frontierSize: int) -> None:
+        self.profile.expanded += 1
+        if self.profile.expanded % self.interval == 0:
+            self.sample()
+
+    def onFinish(self, result: SearchResult) -> None:
+        self.sample()
+        self.profile.expanded = result.expanded
+        self.profile.peakBytes = max(self.peak, tracemalloc.get_traced_memory()[1]) - self.profile.baselineBytes
+        result.memory = self.profile
+
+    def sample(self) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        if peak > self.peak: self.peak = peak
+        if self.profile.counts and current <= self.profile.sampleBytes * 1.1:
+            return
+
+        counts, sizes = self.census()
+        self.profile.sampleBytes = current
+        self.profile.counts = {name: count - self.baselineCounts[name] for name, count in counts.items()}
+        self.profile.sizes = {name: size - self.baselineSizes[name] for name, size in sizes.items()}
+        tracemalloc.reset_peak()
+
+    def census(self) -> Tuple[dict[str, int], dict[str, int]]:
+        ''' Returns the number and the shallow size in bytes of the live Node, State and Action objects
+            of the whole process, and of the entries of the neighbors cache of the problem '''
+        counts = {'Node': 0, 'State': 0, 'Action': 0}
+        sizes = {'Node': 0, 'State': 0, 'Action': 0}
+        for obj in gc.get_objects():
+            name = self.names.get(type(obj))
+            if name is not None:
+                counts[name] += 1
+                sizes[name] += sys.getsizeof(obj)
+        counts['neighborsCache'] = len(self.problem.neighborsCache)
+        sizes['neighborsCache'] = self.problem.neighborsCacheBytes()
+        return counts, sizes
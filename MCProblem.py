@@ -1,15 +1,43 @@
-from typing import Literal, Tuple, Union
+import copy
+import os
+import struct
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Iterator, Literal, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional, without it the state graph is built by the pure Python builder
+    np = None
+
+# version of the problem rules, it must change whenever a change in MCProblem changes the solutions
+RULES_VERSION = 1
+
+# version of the pattern database file format
+PATTERN_DATABASE_VERSION = 1
+PATTERN_DATABASE_HEADER = struct.Struct('<8sIIQQcQ')
+
+# directory of the files cached between runs, which can be changed by the MC_CACHE_DIR variable
+CACHE_DIR = os.environ.get('MC_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'mcproblem'))
 
 class State():
-    ''' Class that represents the state of the problem '''
-    def __init__(self, miss:int, cann:int, boat:Literal['L', 'R'], heuristic:float = 0.00) -> None:
+    ''' Class that represents the state of the problem
+        The id is the dense integer index of the state, assigned by MCProblem.stateId.
+        The states returned by MCProblem.internState are shared by all the searches, so they must not be changed '''
+    __slots__ = ('miss', 'cann', 'boat', 'heuristic', 'id')
+
+    def __init__(self, miss:int, cann:int, boat:Literal['L', 'R'], heuristic:float = 0.00, id:int = -1) -> None:
         self.miss = miss
         self.cann = cann
         self.boat = boat
         self.heuristic = heuristic
+        self.id = id
     
     def __repr__(self):
-        ''' Returns a string representation of the state, mainly used to hash the state'''
+        ''' Returns a string representation of the state, used only to display the state'''
         return f"({self.miss}_{self.cann}_{self.boat})"
 
     def __eq__(self, other): 
@@ -22,8 +50,15 @@ class State():
 
         return self.miss == other.miss and self.cann == other.cann and self.boat == other.boat
 
+    def __hash__(self):
+        ''' Returns the hash of the state, consistent with __eq__ '''
+        return hash((self.miss, self.cann, self.boat))
+
 class Action():
-    ''' Class that represents the actions of the problem'''
+    ''' Class that represents the actions of the problem.
+        The actions are created once per problem, in the move table, and shared, so they must not be changed '''
+    __slots__ = ('miss', 'cann', 'direction', 'cost')
+
     def __init__(self, miss:int, cann:int, direction:Literal['L', 'R'], cost:float=0.00) -> None:
         self.miss = miss
         self.cann = cann
@@ -32,11 +67,13 @@ class Action():
         # self.heuristic = heuristic
 
     def __repr__(self):
-        ''' Returns a string representation of the state, mainly used to hash the state'''
+        ''' Returns a string representation of the action, used only to display the action'''
         return f"({self.miss}_{self.cann}_{self.direction})"
 
 class Node():
     ''' Class that represents the node of the solution problem'''
+    __slots__ = ('state', 'parent', 'action', 'cost', 'priority')
+
     def __init__(self, state:State, parent:Union['Node', None]=None, action:Union[Action, None]=None, cost:float=0.00) -> None:
         self.state = state
         self.parent = parent
@@ -47,13 +84,95 @@ class Node():
     def __lt__(self, other: 'Node') -> bool:
         return self.priority < other.priority
 
+class NeighborsCache():
+    ''' Class that represents the cache of neighbors of the problem, indexed by the state id.
+        The policy defines how much memory it can take:
+            - unbounded: keeps the neighbors of every state expanded
+            - lru: keeps at most maxEntries states, evicting the least recently used one
+            - disabled: keeps nothing, so the neighbors are always recalculated
+        The cache counts its hits, misses and evictions.
+        It serves the searches that take the neighbors as (State, Action) tuples and expand each state once:
+        DFS and bidirectional BFS, through iterNeighbors. IDA* and SMA* expand the same states many times, so they
+        call generateNeighbors and keep the neighbors only while the node is in memory. BFS, GBFS and A* walk the
+        edges of the state graph directly, which already holds the neighbors of every state, so they don't use the cache.
+        It can be shared by searches running in several threads: the unbounded cache relies on the atomic
+        dict operations, so its counters are approximate under concurrent use, and the LRU cache takes a lock,
+        since moving and evicting entries changes its order. '''
+    policies = ('unbounded', 'lru', 'disabled')
+
+    def __init__(self, policy: Literal['unbounded', 'lru', 'disabled'] = 'unbounded', maxEntries: int = 0) -> None:
+        if policy not in self.policies:
+            raise ValueError(f"Unknown cache policy: {policy}")
+        if policy == 'lru' and maxEntries < 1:
+            raise ValueError("The LRU cache needs at least 1 entry")
+        self.policy = policy
+        self.maxEntries = maxEntries
+        self.entries: dict[int, list[Tuple[State, Action]]] = OrderedDict() if policy == 'lru' else {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: int) -> list[Tuple[State, Action]] | None:
+        ''' Returns the neighbors of the state id, or None when they are not in the cache '''
+        if self.policy == 'lru':
+            with self.lock:
+                neighbors = self.entries.get(key)
+                if neighbors is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                self.entries.move_to_end(key) # type: ignore
+                return neighbors
+
+        neighbors = self.entries.get(key)
+        if neighbors is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return neighbors
+
+    def put(self, key: int, neighbors: list[Tuple[State, Action]]) -> None:
+        ''' Stores the neighbors of the state id, evicting the least recently used state when the LRU cache is full '''
+        if self.policy == 'disabled':
+            return
+        if self.policy == 'lru':
+            with self.lock:
+                self.entries[key] = neighbors
+                if len(self.entries) > self.maxEntries:
+                    self.entries.popitem(last=False) # type: ignore
+                    self.evictions += 1
+            return
+        self.entries[key] = neighbors
+
+    def clear(self) -> None:
+        ''' Removes all the entries, the counters are kept '''
+        with self.lock:
+            self.entries.clear()
+
+    @property
+    def hitRate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.00
+
+    def values(self):
+        return self.entries.values()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __repr__(self):
+        return (f"NeighborsCache({self.policy!r}, entries={len(self.entries)}, hits={self.hits}, misses={self.misses}, "
+                f"evictions={self.evictions})")
+
 class MCProblem():
     ''' Class that represents the problem of the missionaries and cannibals
         All algorithms will use this class to solve the problem
         The problem is defined by the number of missionaries and cannibals (groupSize), 
         the boat's capacity (boatCapacity) and the initial margin of the boat (startMargin)'''
 
-    def __init__(self, groupSize:int = 3, boatCapacity: int = 2, startMargin: Literal['L', 'R'] = 'L' ) -> None:
+    def __init__(self, groupSize:int = 3, boatCapacity: int = 2, startMargin: Literal['L', 'R'] = 'L', patternDatabase: bool = False,
+                 cachePolicy: Literal['unbounded', 'lru', 'disabled'] = 'unbounded', cacheSize: int = 0) -> None:
         # defines the total size of each group (Missionaire or Cannibals)
         if (groupSize < 1):
             raise ValueError("The group size must be greater than 0")
@@ -64,18 +183,91 @@ class MCProblem():
             raise ValueError("The boat's capacity has to be greater than 0")
         self.boatCapacity = boatCapacity
         
+        # set the number of distinct states, (groupSize+1)^2 * 2, used by the dense state ids
+        self.stateCount = (self.groupSize + 1) ** 2 * 2
+
         # set the initial state of the problem
         self.initialState = State(self.groupSize, self.groupSize, startMargin)
+        self.initialState.id = self.stateId(self.initialState.miss, self.initialState.cann, self.initialState.boat)
 
         # set the goal state of the problem
         self.goalState = State(0, 0, 'L' if startMargin == 'R' else 'R')
-
-        # set the cache of neighbors
-        self.neighborsCache:dict[str, list[Tuple[Action, State]]] = {}
+        self.goalState.id = self.stateId(self.goalState.miss, self.goalState.cann, self.goalState.boat)
+
+        # set the move table, with the legal boat loads for each direction.
+        # The move ids index moveList, which holds the 'L' moves followed by the 'R' moves
+        self.moves = self.generateMoves()
+        self.moveList = self.moves['L'] + self.moves['R']
+        self.moveBase = {'L': 0, 'R': len(self.moves['L'])}
+        self.moveIds = {action: id for id, action in enumerate(self.moveList)}
+        # the moves are created in pairs, so the reverse of a move has the same index in the other direction
+        self.reverseMoves = dict(zip(self.moves['L'], self.moves['R'])) | dict(zip(self.moves['R'], self.moves['L']))
+        # the arrays of move ids take 2 bytes per move while the move table fits in an unsigned short, and 4 bytes otherwise
+        self.moveTypecode = 'H' if len(self.moveList) <= 0xFFFF else 'I'
+
+        # set the reachable state graph in CSR form, built once on the first expansion.
+        # graphIds maps a row to its state id and graphIndex maps a state id to its row.
+        # The edges of a row are in graphTargets (target rows) and graphMoves (move ids),
+        # from graphOffsets[row] up to graphOffsets[row+1]
+        self.graphIds = array('q')
+        self.graphIndex: dict[int, int] = {}
+        self.graphOffsets = array('q')
+        self.graphTargets = array('i')
+        self.graphMoves = array(self.moveTypecode)
+        self.graphBuilt = False
+
+        # set the pattern database, with the exact distance to the goal of each graph row (-1 when unreachable).
+        # When enabled, it is loaded from the cache directory, or built, on the first heuristic calculation
+        self.patternDatabase = patternDatabase
+        self.goalDistances: array | None = None
+
+        # set the lock of the lazy initializations (state graph and pattern database), so concurrent searches build them once
+        self.lock = threading.RLock()
+
+        # set the shared states, created once per problem with their heuristic, indexed by the state id
+        self.states: dict[int, State] = {}
+
+        # set the cache of neighbors, indexed by the state id.
+        # The neighbors only depend on the configuration, so the cache is kept between searches.
+        # BFS, GBFS and A* read the state graph instead, so only the other searches use it
+        self.neighborsCache = NeighborsCache(cachePolicy, cacheSize)
+
+    def stateId(self, miss:int, cann:int, boat:Literal['L', 'R']) -> int:
+        ''' Returns the dense integer index of the state, in the range [0, stateCount).
+            The index is a perfect encoding of (miss, cann, boat): ((miss * (groupSize+1)) + cann) * 2 + side '''
+        return ((miss * (self.groupSize + 1)) + cann) * 2 + (boat == 'R')
+
+    def stateFromId(self, id:int) -> State:
+        ''' Returns the state that corresponds to the dense integer index '''
+        position, side = divmod(id, 2)
+        miss, cann = divmod(position, self.groupSize + 1)
+        return State(miss, cann, 'R' if side else 'L', id=id)
+
+    def internState(self, id:int) -> State:
+        ''' Returns the shared state of the dense integer index, with its heuristic.
+            Each state is created once per problem and reused by the neighbors, the search nodes and the paths '''
+        state = self.states.get(id)
+        if state is None:
+            state = self.stateFromId(id)
+            state.heuristic = self.calculateHeuristic(state)
+            # another thread may have created the same state, so the first one stored is kept
+            state = self.states.setdefault(id, state)
+        return state
 
     def reset(self) -> None:
-        ''' Resets the problem to the initial state '''
-        self.neighborsCache = {}
+        ''' Clears the neighbors cache, the next searches start with a cold cache.
+            The state graph only depends on the configuration, so it is kept '''
+        self.neighborsCache.clear()
+
+    def withColdCache(self) -> 'MCProblem':
+        ''' Returns a copy of the problem with a new, empty neighbors cache of the same policy and no shared states.
+            The copy shares the state graph and the pattern database, so its searches start with cold caches,
+            whatever ran before, without clearing the ones used by the searches of this problem '''
+        self.buildGraph()
+        problem = copy.copy(self)
+        problem.states = {}
+        problem.neighborsCache = NeighborsCache(self.neighborsCache.policy, self.neighborsCache.maxEntries)
+        return problem
 
     # def calculateHeuristic(self, state:State, action:Action) -> int:
     #     ''' Calculates the heuristic of the action based on the current state
@@ -85,46 +277,337 @@ class MCProblem():
       
     #     return state.miss + state.cann - (action.miss + action.cann)
 
-    # This heuristic is considered the best one for this problem
+    # This heuristic is admissible and consistent, so A* finds the shortest path expanding each state once
     def calculateHeuristic(self, state:State) -> float:
-        ''' The difference heuristic is based on the idea of measuring the difference between 
-            the number of missionaries and cannibals on either side of the river.
+        ''' The trips heuristic is a lower bound on the number of boat trips to reach the goal.
             
-            In this heuristic, the initial state is assigned a heuristic value of zero, 
-            and the goal state is assigned a heuristic value of one (since all the missionaries 
-            and cannibals must be on the opposite side of the river in the goal state). 
-            For all other states, the heuristic value is calculated as the absolute difference 
-            between the number of missionaries and cannibals on the original side of the river 
-            minus the number of missionaries and cannibals on the opposite side of the river, 
-            divided by the total number of people.            '''
+            Each trip to the opposite margin takes at most boatCapacity people, and each trip back
+            brings at least one person, so a round trip moves at most boatCapacity - 1 people.
+            With P people on the initial margin and the boat there, the last trip takes up to 
+            boatCapacity people and the ones before it need ceil((P - 1) / (boatCapacity - 1)) - 1 
+            round trips, so at least 2 * ceil((P - 1) / (boatCapacity - 1)) - 1 trips are needed.
+            With the boat on the opposite margin, it must come back first, bringing one more person,
+            which gives 2 * ceil(P / (boatCapacity - 1)) trips.
+            Consecutive states never differ by more than one trip, so the heuristic is consistent.
+            When the pattern database is enabled, the exact distance to the goal is used instead. '''
       
-        initMarginPeople = state.miss + state.cann
-        goalMarginPeople = self.groupSize * 2 - initMarginPeople
-        heuristic = abs(initMarginPeople - goalMarginPeople) / (self.groupSize * 2)
-        return heuristic
-        # return 1
+        if self.patternDatabase:
+            goalDistances = self.goalDistances
+            if goalDistances is None:
+                with self.lock:
+                    if self.goalDistances is None:
+                        self.loadPatternDatabase()
+                goalDistances = self.goalDistances
+            assert goalDistances is not None
+            row = self.graphIndex.get(state.id)
+            if row is not None:
+                distance = goalDistances[row]
+                return distance if distance >= 0 else float('inf')
+
+        people = state.miss + state.cann
+        capacity = max(self.boatCapacity - 1, 1)
+        if state.boat == self.initialState.boat:
+            return max(2 * (-(-(people - 1) // capacity)) - 1, 0)
+        return 2 * (-(-people // capacity))
+
+    def buildPatternDatabase(self) -> array:
+        ''' Returns the exact distance to the goal of each row of the state graph, -1 when the goal can't be reached.
+            The moves are reversible, so a single BFS from the goal state over the graph gives all the distances '''
+
+        self.buildGraph()
+        distances = array('i', [-1]) * len(self.graphIds)
+        goal = self.graphIndex.get(self.goalState.id)
+        if goal is None:
+            return distances
+
+        distances[goal] = 0
+        level = [goal]
+        while level:
+            nextLevel = []
+            for row in level:
+                distance = distances[row] + 1
+                for edge in range(self.graphOffsets[row], self.graphOffsets[row+1]):
+                    target = self.graphTargets[edge]
+                    if distances[target] < 0:
+                        distances[target] = distance
+                        nextLevel.append(target)
+            level = nextLevel
+
+        return distances
+
+    def patternDatabasePath(self) -> str:
+        ''' Returns the path of the pattern database file of the problem configuration '''
+        return os.path.join(CACHE_DIR, f"pdb-{self.groupSize}-{self.boatCapacity}-{self.initialState.boat}.bin")
+
+    def loadPatternDatabase(self) -> None:
+        ''' Loads the pattern database from the cache directory.
+            The file holds a header, the state ids and their distances to the goal. 
+            If the file is missing or stale, the database is built and saved for the next runs '''
+
+        self.buildGraph()
+        header = (b'MCPDB', PATTERN_DATABASE_VERSION, RULES_VERSION, self.groupSize, self.boatCapacity, 
+                  self.initialState.boat.encode(), len(self.graphIds))
+        try:
+            with open(self.patternDatabasePath(), 'rb') as file:
+                fileHeader = PATTERN_DATABASE_HEADER.unpack(file.read(PATTERN_DATABASE_HEADER.size))
+                if fileHeader[0].rstrip(b'\0') != header[0] or fileHeader[1:] != header[1:]:
+                    raise ValueError("The pattern database file is stale")
+                ids = array('q')
+                ids.fromfile(file, fileHeader[-1])
+                distances = array('i')
+                distances.fromfile(file, fileHeader[-1])
+            if sys.byteorder != 'little':
+                ids.byteswap()
+                distances.byteswap()
+
+            # the rows depend on how the graph was built, so the distances are mapped by state id.
+            # They are only published when complete, since other threads read them without the lock
+            goalDistances = array('i', [-1]) * len(self.graphIds)
+            for id, distance in zip(ids, distances):
+                goalDistances[self.graphIndex[id]] = distance
+            self.goalDistances = goalDistances
+            return
+        except (OSError, EOFError, ValueError, KeyError, struct.error):
+            pass
+
+        self.goalDistances = self.buildPatternDatabase()
+        self.savePatternDatabase(header)
+
+    def savePatternDatabase(self, header: tuple) -> None:
+        ''' Saves the pattern database in the cache directory. The cache is optional, so errors are ignored '''
+        assert self.goalDistances is not None
+        ids = array('q', self.graphIds)
+        distances = array('i', self.goalDistances)
+        if sys.byteorder != 'little':
+            ids.byteswap()
+            distances.byteswap()
+
+        path = self.patternDatabasePath()
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(f"{path}.{os.getpid()}.tmp", 'wb') as file:
+                file.write(PATTERN_DATABASE_HEADER.pack(*header))
+                ids.tofile(file)
+                distances.tofile(file)
+            os.replace(f"{path}.{os.getpid()}.tmp", path)
+        except OSError:
+            pass
+
+    def generateMoves(self) -> dict[str, list[Action]]:
+        ''' Generates the move table of the problem, split by the direction of the boat.
+            A move is any boat load with 1 <= miss + cann <= boatCapacity people,
+            so the table has O(boatCapacity^2) moves regardless of the group size.
+            The cost is set to 1 for all moves. '''
+
+        moves: dict[str, list[Action]] = {'L': [], 'R': []}
+        maxCrew = min(self.boatCapacity, self.groupSize)
+
+        for miss in range(maxCrew+1):
+            for cann in range(min(maxCrew, self.boatCapacity - miss)+1):
+                if miss + cann == 0:
+                    continue
+                directions: list[Literal['L', 'R']] = ['L', 'R']
+                for direction in directions:
+                    moves[direction].append(Action(miss, cann, direction, 1))
 
-    def generateActions(self, state:State) -> list[Tuple[Action, State]]:
-        ''' Generates all the possible actions based on the current state.
-            The actions are generated by all the possible combinations of people that can be moved.
-            The actions are also generated by all the possible directions that the boat can move.
-            The actions are also validated to make sure that the action is valid. 
-            The cost is set to 1 for all actions.
-            The heuristic is calculated for each action. '''
+        return moves
+
+    def buildGraph(self) -> None:
+        ''' Builds the state graph in CSR form, once per problem.
+            Uses the vectorized builder when numpy is available, and the pure Python one otherwise '''
+
+        if self.graphBuilt:
+            return
+
+        with self.lock:
+            # another thread may have built the graph while this one waited for the lock
+            if self.graphBuilt:
+                return
+            if np is not None:
+                self.buildGraphNumpy()
+            else:
+                self.buildGraphPython()
+            self.graphBuilt = True
+
+    def buildGraphPython(self) -> None:
+        ''' Builds the graph of all the states reachable from the initial state, in CSR form.
+            Each state is expanded once, with the same checks of validateAction applied on
+            plain integers, and its edges are stored in the order of the move table. '''
+
+        groupSize = self.groupSize
+        initialBoat = self.initialState.boat
+        ids = array('q', [self.initialState.id])
+        index = {self.initialState.id: 0}
+        offsets = array('q', [0])
+        targets = array('i')
+        moveIds = array(self.moveTypecode)
+
+        row = 0
+        while row < len(ids):
+            position, side = divmod(ids[row], 2)
+            miss, cann = divmod(position, groupSize + 1)
+            direction: Literal['L', 'R'] = 'L' if side else 'R'
+            sign = -1 if direction != initialBoat else 1
+            base = self.moveBase[direction]
+
+            for k, action in enumerate(self.moves[direction]):
+                newMiss = miss + sign * action.miss
+                newCann = cann + sign * action.cann
+                # can't move more people than the margins have
+                if newMiss < 0 or newCann < 0 or newMiss > groupSize or newCann > groupSize:
+                    continue
+                # can't have more cannibals than missionaires in any margin
+                if newMiss and newMiss < newCann:
+                    continue
+                if groupSize - newMiss and groupSize - newMiss < groupSize - newCann:
+                    continue
+
+                target = ((newMiss * (groupSize + 1)) + newCann) * 2 + (direction == 'R')
+                targetRow = index.get(target)
+                if targetRow is None:
+                    targetRow = index[target] = len(ids)
+                    ids.append(target)
+                targets.append(targetRow)
+                moveIds.append(base + k)
+
+            offsets.append(len(targets))
+            row += 1
+
+        self.graphIds = ids
+        self.graphIndex = index
+        self.graphOffsets = offsets
+        self.graphTargets = targets
+        self.graphMoves = moveIds
+
+    def safeMask(self):
+        ''' Returns the numpy boolean mask of the safe (miss, cann) pairs of the initial margin.
+            The mask is computed over the full grid by broadcasting, applying the rule of
+            validateAction to both margins: cannibals can't outnumber missionaires. 
+            The boat doesn't change the safety, so the mask holds for both sides '''
         
-        actions:list[Tuple[Action, State]] = []
+        groupSize = self.groupSize
+        miss = np.arange(groupSize + 1, dtype=np.int64)[:, None]
+        cann = np.arange(groupSize + 1, dtype=np.int64)[None, :]
+
+        # the initial margin is safe with at least as many missionaires, or without missionaires (row miss == 0)
+        safe = miss >= cann
+        safe[0, :] = True
+        # and so is the opposite margin, which has no missionaires in the row miss == groupSize
+        opposite = (groupSize - miss) >= (groupSize - cann)
+        opposite[groupSize, :] = True
+        safe &= opposite
+        return safe
+
+    def buildGraphNumpy(self) -> None:
+        ''' Builds the graph of all the safe states in CSR form, with bulk numpy operations.
+            The safe states include every state reachable from the initial state.
+            The rows are the safe states sorted by id, and the transitions of each move are
+            computed for all the states at once, then grouped by source row in the order of the move table. '''
+
+        groupSize = self.groupSize
+        initialBoat = self.initialState.boat
+        safe = self.safeMask()
+
+        # positions (miss * (groupSize+1) + cann) of the safe pairs, in ascending order
+        positions = np.flatnonzero(safe)
+        miss, cann = np.divmod(positions, groupSize + 1)
+        # each position gives 2 rows, one for each side of the boat, so rows are sorted by id
+        ids = (positions[:, None] * 2 + np.arange(2)).ravel()
+
+        sources = []
+        targets = []
+        moveIds = []
+        for side, direction in ((0, 'R'), (1, 'L')):
+            sign = -1 if direction != initialBoat else 1
+            base = self.moveBase[direction]
+            for k, action in enumerate(self.moves[direction]):
+                newMiss = miss + sign * action.miss
+                newCann = cann + sign * action.cann
+                # can't move more people than the margins have
+                valid = (newMiss >= 0) & (newCann >= 0) & (newMiss <= groupSize) & (newCann <= groupSize)
+                source = np.flatnonzero(valid)
+                # can't have more cannibals than missionaires in any margin
+                keep = safe[newMiss[source], newCann[source]]
+                source = source[keep]
+                target = np.searchsorted(positions, newMiss[source] * (groupSize + 1) + newCann[source])
+
+                sources.append(source * 2 + side)
+                targets.append(target * 2 + (direction == 'R'))
+                moveIds.append(np.full(len(source), base + k))
+
+        source = np.concatenate(sources)
+        order = np.argsort(source, kind='stable')
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(source, minlength=len(ids)), out=offsets[1:])
+
+        self.graphIds = array('q', ids.astype(np.int64).tobytes())
+        self.graphIndex = dict(zip(self.graphIds, range(len(ids))))
+        self.graphOffsets = array('q', offsets.tobytes())
+        self.graphTargets = array('i', np.concatenate(targets)[order].astype(np.int32).tobytes())
+        # the typecode of the move ids is sized from the move table, so the cast never truncates a move id
+        if len(self.moveList) - 1 > np.iinfo(self.moveTypecode).max:
+            raise OverflowError(f"The move table has {len(self.moveList)} moves, more than the move ids can hold")
+        self.graphMoves = array(self.moveTypecode, np.concatenate(moveIds)[order].astype(self.moveTypecode).tobytes())
+
+    def isSolvable(self) -> bool:
+        ''' Returns true if the goal state can be reached from the initial state, in constant time.
+            A boat for 1 person can never take anyone across, as the same person has to bring it back.
+            A boat for 2 people solves up to 3 pairs, and a boat for 3 people up to 5 pairs.
+            From 4 seats on, any group size can be solved.
+            The rule matches the exhaustive check of goalReachable for small sizes. '''
+
+        if self.boatCapacity == 1:
+            return False
+        if self.boatCapacity == 2:
+            return self.groupSize <= 3
+        if self.boatCapacity == 3:
+            return self.groupSize <= 5
+        return True
+
+    def goalReachable(self) -> bool:
+        ''' Returns true if the goal state can be reached from the initial state.
+            Walks the whole state graph from the initial state, so it is only meant
+            for small sizes, to check the rule of isSolvable '''
+
+        self.buildGraph()
+        start = self.graphIndex[self.initialState.id]
+        goal = self.graphIndex.get(self.goalState.id)
+        seen = {start}
+        stack = [start]
+        while stack:
+            row = stack.pop()
+            for edge in range(self.graphOffsets[row], self.graphOffsets[row+1]):
+                target = self.graphTargets[edge]
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+
+        return goal in seen
+
+    def generateNeighbors(self, state:State) -> Iterator[Tuple[State, Action]]:
+        ''' Generates the neighbors of the state, one at a time, as (State, Action) tuples.
+            States reachable from the initial state are read from the state graph.
+            Other states take the actions from the move table, for the direction opposite 
+            to the boat's margin, validating each one to make sure that the action is valid. 
+            The neighbors are the shared states of internState, with their heuristic. '''
+
+        self.buildGraph()
+        row = self.graphIndex.get(state.id)
+        if row is not None:
+            graphIds, graphTargets, graphMoves, moveList = self.graphIds, self.graphTargets, self.graphMoves, self.moveList
+            states, internState = self.states, self.internState
+            for edge in range(self.graphOffsets[row], self.graphOffsets[row+1]):
+                id = graphIds[graphTargets[edge]]
+                yield states.get(id) or internState(id), moveList[graphMoves[edge]]
+            return
         
-        for miss in range(self.groupSize+1):
-            for cann in range(self.groupSize+1):
-                directions: list[Literal['L', 'R']] = ['L', 'R']
-                for direction in directions:
-                    action = Action(miss, cann, direction, 1)
-                    if self.validateAction(state, action):
-                        newState = self.transitionModel(state, action)
-                        newState.heuristic = self.calculateHeuristic(newState)
-                        actions.append((action, newState))
+        for action in self.moves['R' if state.boat == 'L' else 'L']:
+            if self.validateAction(state, action):
+                yield self.internState(self.transitionModel(state, action).id), action
 
-        return actions
+    def generateActions(self, state:State) -> list[Tuple[Action, State]]:
+        ''' Generates all the possible actions based on the current state, as (Action, State) tuples '''
+        return [(action, newState) for newState, action in self.generateNeighbors(state)]
 
     def validateAction(self, state:State, action:Action) -> bool:
         ''' Validates the action based on the current state.
@@ -145,65 +628,84 @@ class MCProblem():
 
         # the boat can't move more people that the margin has
         if action.direction != self.initialState.boat:
-            initialMargin = {
-                "miss": state.miss - action.miss,
-                "cann": state.cann - action.cann
-            }
-            oppositeMargin = {
-                "miss": (self.groupSize - state.miss) + action.miss,
-                "cann": (self.groupSize - state.cann) + action.cann
-            }
+            initialMiss = state.miss - action.miss
+            initialCann = state.cann - action.cann
+            oppositeMiss = (self.groupSize - state.miss) + action.miss
+            oppositeCann = (self.groupSize - state.cann) + action.cann
 
         else:
-            initialMargin = {
-                "miss": state.miss + action.miss,
-                "cann": state.cann + action.cann
-            }
-            oppositeMargin = {
-                "miss": (self.groupSize - state.miss) - action.miss,
-                "cann": (self.groupSize - state.cann) - action.cann
-            }
+            initialMiss = state.miss + action.miss
+            initialCann = state.cann + action.cann
+            oppositeMiss = (self.groupSize - state.miss) - action.miss
+            oppositeCann = (self.groupSize - state.cann) - action.cann
 
         # can't move more people than the margin has
-        if initialMargin['miss'] < 0 or initialMargin['cann'] < 0:
+        if initialMiss < 0 or initialCann < 0:
             return False
 
-        if oppositeMargin['miss'] < 0 or oppositeMargin['cann'] < 0:
+        if oppositeMiss < 0 or oppositeCann < 0:
             return False
 
         # can't have more cannibals than missionaires in any margin
-        return (initialMargin['miss'] == 0 or initialMargin['miss'] >= initialMargin['cann']) and (oppositeMargin['miss'] == 0 or oppositeMargin['miss'] >= oppositeMargin['cann'])
+        return (initialMiss == 0 or initialMiss >= initialCann) and (oppositeMiss == 0 or oppositeMiss >= oppositeCann)
 
     def getValidActions(self, state:State) -> list[Tuple[Action, State]]:
-        ''' Returns the valid actions based on the current state.
-            The actions are cached to avoid recalculating them. '''
-        
-        key = repr(state)
-
-        if (key in self.neighborsCache):
-            return self.neighborsCache[key]
-        
-        self.neighborsCache[key] = self.generateActions(state)
-        return self.neighborsCache[key]
+        ''' Returns the valid actions based on the current state, as (Action, State) tuples.
+            The neighbors are cached to avoid recalculating them. '''
+        return [(action, newState) for newState, action in self.getNeighbors(state)]
+
+    def neighborsCacheBytes(self) -> int:
+        ''' Returns the memory used by the neighbors cache: the dict, its lists and their tuples.
+            The states and actions inside the tuples are not included '''
+        size = sys.getsizeof(self.neighborsCache.entries)
+        for neighbors in self.neighborsCache.values():
+            size += sys.getsizeof(neighbors) + sum(sys.getsizeof(neighbor) for neighbor in neighbors)
+        return size
 
     def getNeighbors(self, state:State) -> list[Tuple[State, Action]]:
         ''' Returns the neighbors for the current state.
-            The neighbors are the valid actions applied to the current state. '''
-        
-        neighbors:list[Tuple[State, Action]] = []
-
-        for action in self.getValidActions(state):
-            neighbors.append((action[1], action[0]))
+            The neighbors are the valid actions applied to the current state.
+            The list is cached and shared by the later calls, so it must not be changed. '''
 
+        neighbors = self.neighborsCache.get(state.id)
+        if neighbors is None:
+            neighbors = list(self.generateNeighbors(state))
+            self.neighborsCache.put(state.id, neighbors)
         return neighbors
+
+    def iterNeighbors(self, state:State) -> Iterator[Tuple[State, Action]]:
+        ''' Returns an iterator over the neighbors for the current state, in the same order as getNeighbors.
+            A state already in the cache iterates its cached list, other states are generated lazily
+            and cached once all their neighbors were generated, so a search that stops early doesn't build
+            the remaining neighbors, and the next searches reuse the states it fully expanded.
+            Meant for the searches that expand each state once. '''
+
+        neighbors = self.neighborsCache.get(state.id)
+        if neighbors is not None:
+            return iter(neighbors)
+        if self.neighborsCache.policy == 'disabled':
+            return self.generateNeighbors(state)
+        return self.cacheNeighbors(state)
+
+    def cacheNeighbors(self, state:State) -> Iterator[Tuple[State, Action]]:
+        ''' Generates the neighbors of the state lazily, and stores them in the cache after the last one '''
+        neighbors: list[Tuple[State, Action]] = []
+        for neighbor in self.generateNeighbors(state):
+            neighbors.append(neighbor)
+            yield neighbor
+        self.neighborsCache.put(state.id, neighbors)
     
     def transitionModel(self, state:State, action:Action) -> State:
         ''' Returns the new state based on the current state and the action.
             The new state is the current state with the action applied. '''
         if action.direction != self.initialState.boat:
-            return State(state.miss - action.miss, state.cann - action.cann, action.direction)
-        
-        return State(state.miss + action.miss, state.cann + action.cann, action.direction)
+            miss = state.miss - action.miss
+            cann = state.cann - action.cann
+        else:
+            miss = state.miss + action.miss
+            cann = state.cann + action.cann
+
+        return State(miss, cann, action.direction, id=self.stateId(miss, cann, action.direction))
 
     def showSolution(self, path: list[Tuple[State, Union[Action, None]]]) -> None:
         ''' Prints the solution path in a nice format. '''
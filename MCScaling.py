@@ -0,0 +1,170 @@
+import argparse
+import csv
+import math
+import multiprocessing
+import statistics
+import sys
+from typing import Any, Iterable
+from MCProblem import MCProblem
+from MCSolution import ALGORITHMS, MCSolution
+
+# tracemalloc makes the search several times slower, so the memory run has a larger budget than the timed run
+MEMORY_BUDGET_FACTOR = 10
+
+# columns of the rows written to the CSV report
+SCALING_FIELDS = ['algorithm', 'boatCapacity', 'groupSize', 'status', 'steps', 'expanded', 'generated', 'timeNs', 'peakBytes']
+
+def sizeLadder(start: int, factor: float, maxSize: int) -> list[int]:
+    ''' Returns the geometric ladder of group sizes, from start up to maxSize, multiplying by factor at each step '''
+    if start < 1 or factor <= 1:
+        raise ValueError("The ladder needs a start greater than 0 and a factor greater than 1")
+    sizes: list[int] = []
+    size = float(start)
+    while round(size) <= maxSize:
+        if not sizes or round(size) > sizes[-1]:
+            sizes.append(round(size))
+        size *= factor
+    return sizes
+
+def measurePoint(groupSize: int, boatCapacity: int, algorithm: str, nodeBudget: int, memory: bool, connection) -> None:
+    ''' Solves a single point of the ladder and sends its row through the connection.
+        Runs in its own process, so it can be stopped when it exceeds the time budget.
+        The time is a cold run, including the state graph build, and is sent as soon as it is measured.
+        The peak memory comes from a second run under tracemalloc, measured above the state graph built by
+        the first one, with cold caches and shared states, and is sent after it. '''
+    try:
+        solution = MCSolution(groupSize, boatCapacity)
+        result = solution.runAlgorithm(algorithm, nodeBudget)
+        connection.send({'status': 'ok' if result.found else 'not found', 'steps': result.pathLength,
+                         'expanded': result.expanded, 'generated': result.generated,
+                         'timeNs': result.searchNs + result.pathNs})
+        if memory:
+            # only the peak is needed, so the census of the objects is taken once, at the end
+            profile = solution.profileMemory(algorithm, nodeBudget, interval=sys.maxsize).memory
+            assert profile is not None
+            connection.send({'peakBytes': profile.peakBytes})
+    except MemoryError:
+        connection.send({'status': 'memory'})
+    finally:
+        connection.close()
+
+def runPoint(groupSize: int, boatCapacity: int, algorithm: str, budget: float, nodeBudget: int = 100000,
+             memory: bool = True) -> dict[str, Any]:
+    ''' Returns the row of a single point, with the status timeout when it doesn't finish within the budget, in seconds.
+        The memory run has MEMORY_BUDGET_FACTOR times the budget, and the row has no peak memory when it doesn't finish '''
+    row: dict[str, Any] = {'algorithm': algorithm, 'boatCapacity': boatCapacity, 'groupSize': groupSize}
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=measurePoint, args=(groupSize, boatCapacity, algorithm, nodeBudget, memory, sender))
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(budget):
+            row.update(receiver.recv())
+            if memory and receiver.poll(budget * MEMORY_BUDGET_FACTOR):
+                row.update(receiver.recv())
+        else:
+            row['status'] = 'timeout'
+    except EOFError:
+        # the process died without sending its row, usually killed by the system for using too much memory
+        row.setdefault('status', 'error')
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+    return row
+
+def runScaling(algorithms: Iterable[str], boatCapacities: Iterable[int], sizes: list[int], budget: float = 10.0,
+               nodeBudget: int = 100000, memory: bool = True, verbose: bool = True) -> list[dict[str, Any]]:
+    ''' Runs the ladder of group sizes for each algorithm and boat capacity, and returns the rows.
+        The ladder of an algorithm stops at the first point that doesn't finish within the budget,
+        and the sizes without solution for the capacity are skipped. '''
+    rows: list[dict[str, Any]] = []
+    for algorithm in algorithms:
+        for boatCapacity in boatCapacities:
+            for groupSize in sizes:
+                if not MCProblem(groupSize, boatCapacity).isSolvable():
+                    continue
+                row = runPoint(groupSize, boatCapacity, algorithm.lower(), budget, nodeBudget, memory)
+                rows.append(row)
+                if verbose:
+                    print(f"{row['algorithm'].upper()} - capacidade {boatCapacity} - {groupSize} - {row['status']}", flush=True)
+                if row['status'] != 'ok':
+                    break
+    return rows
+
+def fitExponent(sizes: list[float], values: list[float]) -> float | None:
+    ''' Returns the empirical complexity exponent k of value ~ size^k, the slope of the least squares line
+        in the log-log scale, or None when there are less than 2 points with positive values.
+        Only the larger half of the sizes is used, since the small sizes are dominated by constant costs '''
+    points = [(math.log(size), math.log(value)) for size, value in zip(sizes, values) if size > 0 and value > 0]
+    if len(points) > 2:
+        points = points[(len(points) - 1) // 2:]
+    if len(points) < 2 or len({x for x, _ in points}) < 2:
+        return None
+    slope, _ = statistics.linear_regression([x for x, _ in points], [y for _, y in points])
+    return slope
+
+def describeScaling(rows: list[dict[str, Any]], budget: float) -> str:
+    ''' Returns the text report, with a table and the fitted exponents for each algorithm and boat capacity '''
+    lines = [f"Relatório de escalabilidade - orçamento de {budget} s por ponto"]
+    groups: dict[tuple[str, int], list[dict[str, Any]]] = {}
+    for row in rows:
+        groups.setdefault((row['algorithm'], row['boatCapacity']), []).append(row)
+
+    for (algorithm, boatCapacity), group in groups.items():
+        lines.append("")
+        lines.append(f"{algorithm.upper()} - capacidade {boatCapacity}")
+        lines.append(f"  {'groupSize':>10}  {'passos':>8}  {'expandidos':>11}  {'tempo (ms)':>11}  {'memória (bytes)':>15}  situação")
+        for row in group:
+            time = f"{row['timeNs'] / 10**6:.3f}" if 'timeNs' in row else '-'
+            lines.append(f"  {row['groupSize']:>10}  {row.get('steps', '-'):>8}  {row.get('expanded', '-'):>11}  {time:>11}  "
+                         f"{row.get('peakBytes', '-'):>15}  {row['status']}")
+
+        done = [row for row in group if row['status'] == 'ok']
+        sizes = [row['groupSize'] for row in done]
+        exponents = []
+        for name, field in (('tempo', 'timeNs'), ('expandidos', 'expanded'), ('memória', 'peakBytes')):
+            exponent = fitExponent(sizes, [row.get(field, 0) for row in done])
+            exponents.append(f"{name} N^{exponent:.2f}" if exponent is not None else f"{name} -")
+        lines.append(f"  expoentes: {' - '.join(exponents)}")
+        if group[-1]['status'] != 'ok':
+            lines.append(f"  limite: {sizes[-1] if sizes else '-'} ({group[-1]['groupSize']}: {group[-1]['status']})")
+        else:
+            lines.append(f"  limite: não atingido até {group[-1]['groupSize']}")
+    return "\n".join(lines)
+
+def writeScalingCsv(rows: list[dict[str, Any]], output: str) -> None:
+    with open(output, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=SCALING_FIELDS, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório de escalabilidade dos algoritmos de busca do problema dos missionários e canibais")
+    parser.add_argument('--algorithms', nargs='+', default=ALGORITHMS, help="algoritmos")
+    parser.add_argument('--capacities', type=lambda text: [int(part) for part in text.split(',')], default=[4],
+                        help="capacidades do barco, como 3,4,6")
+    parser.add_argument('--start', type=int, default=4, help="menor tamanho do grupo")
+    parser.add_argument('--factor', type=float, default=2.0, help="razão entre tamanhos consecutivos")
+    parser.add_argument('--max-size', type=int, default=1000000, help="maior tamanho do grupo")
+    parser.add_argument('--budget', type=float, default=10.0, help="tempo máximo por ponto, em segundos")
+    parser.add_argument('--node-budget', type=int, default=100000, help="limite de nós do SMA*")
+    parser.add_argument('--no-memory', action='store_true', help="não mede o pico de memória")
+    parser.add_argument('--csv', help="arquivo CSV de saída")
+    parser.add_argument('--text', help="arquivo de texto de saída, o relatório é exibido quando não for informado")
+    args = parser.parse_args()
+
+    sizes = sizeLadder(args.start, args.factor, args.max_size)
+    rows = runScaling(args.algorithms, args.capacities, sizes, args.budget, args.node_budget, not args.no_memory)
+    report = describeScaling(rows, args.budget)
+    if args.csv:
+        writeScalingCsv(rows, args.csv)
+    if args.text:
+        with open(args.text, 'w') as file:
+            file.write(report + "\n")
+    else:
+        print(report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+import heapq
+from abc import ABC, abstractmethod
+from array import array
+from collections import deque
+from typing import Generic, Hashable, Tuple, TypeVar, Union
+from MCProblem import Action, MCProblem, Node, State
+
+K = TypeVar('K', bound=Hashable)
+T = TypeVar('T')
+
+class ClosedSet(Generic[K]):
+    ''' Class that represents the set of states already reached by a search algorithm.
+        The membership test is a hash lookup, so each duplicate check costs O(1).
+        The same API is shared by all search algorithms, and it also counts how many
+        keys were inserted and how many duplicates were detected. '''
+    def __init__(self) -> None:
+        self.keys: set[K] = set()
+        self.inserted = 0
+        self.duplicates = 0
+
+    def add(self, key: K) -> bool:
+        ''' Adds the key to the set.
+            Returns true if the key was not reached before, false if it is a duplicate '''
+        if key in self.keys:
+            self.duplicates += 1
+            return False
+
+        self.keys.add(key)
+        self.inserted += 1
+        return True
+
+    def discard(self, key: K) -> None:
+        ''' Removes the key from the set, so it can be reached again '''
+        self.keys.discard(key)
+
+    def clear(self) -> None:
+        ''' Removes all the keys and resets the counters '''
+        self.keys.clear()
+        self.inserted = 0
+        self.duplicates = 0
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+class Frontier(ABC, Generic[T]):
+    ''' Abstract class that represents the frontier of a search algorithm.
+        The frontiers are meant for a single thread, so no locks are taken on push or pop.
+        Every frontier records the maximum number of items it held (maxSize).
+        A frontier that doesn't implement push, pop and __len__ can't be instantiated. '''
+    def __init__(self) -> None:
+        self.maxSize = 0
+
+    @abstractmethod
+    def push(self, item: T, priority: float = 0.00) -> None:
+        ''' Adds the item to the frontier. The priority is ignored by non priority frontiers '''
+
+    @abstractmethod
+    def pop(self) -> T:
+        ''' Removes and returns the next item of the frontier '''
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ''' Returns the number of items in the frontier '''
+
+class FifoFrontier(Frontier[T]):
+    ''' First in, first out frontier, used by BFS '''
+    def __init__(self) -> None:
+        super().__init__()
+        self.items: deque[T] = deque()
+
+    def push(self, item: T, priority: float = 0.00) -> None:
+        self.items.append(item)
+        if len(self.items) > self.maxSize: self.maxSize = len(self.items)
+
+    def pop(self) -> T:
+        return self.items.popleft()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+class LifoFrontier(Frontier[T]):
+    ''' Last in, first out frontier, used by DFS '''
+    def __init__(self) -> None:
+        super().__init__()
+        self.items: list[T] = []
+
+    def push(self, item: T, priority: float = 0.00) -> None:
+        self.items.append(item)
+        if len(self.items) > self.maxSize: self.maxSize = len(self.items)
+
+    def pop(self) -> T:
+        return self.items.pop()
+
+    def peek(self) -> T:
+        ''' Returns the next item of the frontier, without removing it '''
+        return self.items[-1]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+class HeapFrontier(Frontier[T]):
+    ''' Binary heap frontier, used by A* and GBFS.
+        The lowest priority is popped first. Ties are broken by the optional tieBreak value
+        and then by insertion order, so the items themselves are never compared. '''
+    def __init__(self) -> None:
+        super().__init__()
+        self.items: list[Tuple[float, float, int, T]] = []
+        self.counter = 0
+
+    def push(self, item: T, priority: float = 0.00, tieBreak: float = 0.00) -> None:
+        heapq.heappush(self.items, (priority, tieBreak, self.counter, item))
+        self.counter += 1
+        if len(self.items) > self.maxSize: self.maxSize = len(self.items)
+
+    def pop(self) -> T:
+        return heapq.heappop(self.items)[3]
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+class SearchTree():
+    ''' Class that represents the search tree of BFS, GBFS and A*, without one Node object per node.
+        The parent row, the move id and the path cost (g) of each state are kept in parallel arrays,
+        indexed by the row of the state in the state graph of the problem. The root has no parent (-1),
+        and the states not reached yet have an infinite cost. The move ids use the typecode of the
+        graph edges (MCProblem.moveTypecode), so they hold every move of the table. '''
+    def __init__(self, size: int, moveTypecode: str = 'H') -> None:
+        self.parents = array('i', [-1]) * size
+        self.moves = array(moveTypecode, [0]) * size
+        self.costs = array('d', [float('inf')]) * size
+
+    def path(self, problem: MCProblem, row: int) -> list[Tuple[State, Union[Action, None]]]:
+        ''' Returns the path from the root to the row, in order, walking the parent rows back to the root '''
+        path: list[Tuple[State, Union[Action, None]]] = []
+        parents, moves, graphIds = self.parents, self.moves, problem.graphIds
+        while parents[row] >= 0:
+            parent = parents[row]
+            path.append((problem.internState(graphIds[parent]), problem.moveList[moves[row]]))
+            row = parent
+        path.reverse()
+        return path
+
+class MemoryNode(Node):
+    ''' Class that represents a node of the memory bounded search (SMA*).
+        Besides the Node data, it keeps the neighbors of the state, the indexes of the neighbors
+        not in memory (pending), the f value of the children that were forgotten
+        and its latest entry in the open list (-1 when it is not open) '''
+    __slots__ = ('depth', 'index', 'neighbors', 'pending', 'children', 'forgotten', 'entry')
+
+    def __init__(self, state:State, parent:Union['MemoryNode', None]=None, action:Union[Action, None]=None, cost:float=0.00, depth:int=0, index:int=-1) -> None:
+        super().__init__(state, parent, action, cost)
+        self.depth = depth
+        self.index = index
+        self.neighbors: list[Tuple[State, Action]] = []
+        self.pending: deque[int] = deque()
+        self.children: list['MemoryNode'] = []
+        self.forgotten: dict[int, float] = {}
+        self.entry = -1
+
+class MemoryOpenList():
+    ''' Class that represents the open list of SMA*.
+        A min heap ordered by (f, -depth) gives the deepest node with the lowest f value, and a max heap
+        ordered the same way gives the shallowest leaf with the highest f value, the one forgotten when
+        the memory is full. Both use lazy deletion: each node keeps the counter of its latest entries,
+        so the entries of nodes that were removed or updated are skipped when they reach the top.
+        Ties are broken by insertion order, so the nodes themselves are never compared. '''
+    def __init__(self) -> None:
+        self.lowest: list[Tuple[float, int, int, MemoryNode]] = []
+        self.highest: list[Tuple[float, int, int, MemoryNode]] = []
+        self.counter = 0
+        self.size = 0
+
+    def add(self, node: MemoryNode) -> None:
+        ''' Adds the node to the open list, or moves it after its f value changed '''
+        if node.entry < 0:
+            self.size += 1
+        node.entry = self.counter
+        heapq.heappush(self.lowest, (node.priority, -node.depth, self.counter, node))
+        heapq.heappush(self.highest, (-node.priority, node.depth, self.counter, node))
+        self.counter += 1
+        # the stale entries are dropped once they outnumber the open nodes, so the heaps stay bounded by the budget
+        if len(self.lowest) > 4 * self.size + 64:
+            self.lowest = [entry for entry in self.lowest if entry[3].entry == entry[2]]
+            self.highest = [entry for entry in self.highest if entry[3].entry == entry[2]]
+            heapq.heapify(self.lowest)
+            heapq.heapify(self.highest)
+
+    def discard(self, node: MemoryNode) -> None:
+        if node.entry >= 0:
+            node.entry = -1
+            self.size -= 1
+
+    def best(self) -> MemoryNode | None:
+        ''' Returns the deepest open node with the lowest f value, without removing it '''
+        lowest = self.lowest
+        while lowest:
+            _, _, counter, node = lowest[0]
+            if node.entry == counter:
+                return node
+            heapq.heappop(lowest)
+        return None
+
+    def worstLeaf(self) -> MemoryNode | None:
+        ''' Returns the shallowest open leaf with the highest f value, without removing it.
+            The root is never a leaf. An open node with children is dropped from the max heap,
+            since it is only a leaf again when it loses all of them, and then it is added again '''
+        highest = self.highest
+        while highest:
+            _, _, counter, node = highest[0]
+            if node.entry == counter and not node.children and node.parent is not None:
+                return node
+            heapq.heappop(highest)
+        return None
+
+    def __contains__(self, node: MemoryNode) -> bool:
+        return node.entry >= 0
+
+    def __len__(self) -> int:
+        return self.size
+
+class SearchResult():
+    ''' Class that represents the result of a search algorithm.
+        Holds the solution path and the search statistics, with the times measured by perf_counter_ns,
+        split into the search itself and the path reconstruction, and the MemoryProfile when it was profiled.
+        A result read from the solution cache keeps the statistics and the times of the original search,
+        and the time of the lookup in cacheNs '''
+    def __init__(self, algorithm: str, found: bool = False, path: Union[list[Tuple[State, Union[Action, None]]], None] = None, 
+                 solvable: bool = True, analysed: int = 0, expanded: int = 0, generated: int = 0, duplicates: int = 0, 
+                 maxFrontier: int = 0, searchNs: int = 0, pathNs: int = 0, cacheHit: bool = False, 
+                 memory: Union['MemoryProfile', None] = None, cacheNs: int = 0) -> None:
+        self.algorithm = algorithm
+        self.found = found
+        self.path: list[Tuple[State, Union[Action, None]]] = path if path is not None else []
+        self.solvable = solvable
+        self.analysed = analysed
+        self.expanded = expanded
+        self.generated = generated
+        self.duplicates = duplicates
+        self.maxFrontier = maxFrontier
+        self.searchNs = searchNs
+        self.pathNs = pathNs
+        self.cacheHit = cacheHit
+        self.memory = memory
+        self.cacheNs = cacheNs
+
+    @property
+    def pathLength(self) -> int:
+        return len(self.path)
+
+    @property
+    def elapsedMs(self) -> float:
+        ''' Returns the total time, search and path reconstruction, in milliseconds '''
+        return (self.searchNs + self.pathNs) / 10**6
+
+    def describe(self) -> str:
+        ''' Returns the summary line of the result '''
+        if not self.found:
+            return f"Não foi possível resolver o problema - usando {self.algorithm.upper()}"
+        if self.cacheHit:
+            return f"{self.algorithm.upper()} - {self.pathLength} passos - {self.cacheNs / 10**6} ms - {self.analysed} estados analisados (cache)"
+        return f"{self.algorithm.upper()} - {self.pathLength} passos - {self.elapsedMs} ms - {self.analysed} estados analisados"
+
+    def __repr__(self):
+        return (f"SearchResult({self.algorithm!r}, found={self.found}, pathLength={self.pathLength}, expanded={self.expanded}, "
+                f"generated={self.generated}, duplicates={self.duplicates}, maxFrontier={self.maxFrontier}, "
+                f"searchNs={self.searchNs}, pathNs={self.pathNs}, cacheHit={self.cacheHit}, cacheNs={self.cacheNs})")
+
+class MemoryProfile():
+    ''' Class that represents the memory used by a search, measured by tracemalloc.
+        The peak is measured above the memory in use before the search (baseline).
+        The breakdown counts the Node, State and Action objects and the neighbors cache entries added to the ones
+        alive before the search, at the sample with the highest memory use, with the shallow size of each object in bytes '''
+    def __init__(self, baselineBytes: int = 0) -> None:
+        self.baselineBytes = baselineBytes
+        self.peakBytes = 0
+        self.sampleBytes = 0
+        self.expanded = 0
+        self.counts: dict[str, int] = {}
+        self.sizes: dict[str, int] = {}
+
+    @property
+    def bytesPerExpanded(self) -> float:
+        ''' Returns the peak memory of the search divided by the number of expanded states '''
+        return self.peakBytes / self.expanded if self.expanded else 0.00
+
+    def describe(self) -> str:
+        ''' Returns the summary of the profile, one line per type '''
+        lines = [f"Pico de memória: {self.peakBytes} bytes - {self.bytesPerExpanded:.1f} bytes por estado expandido"]
+        for name, count in self.counts.items():
+            lines.append(f"  {name}: {count} objetos - {self.sizes[name]} bytes")
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return (f"MemoryProfile(peakBytes={self.peakBytes}, bytesPerExpanded={self.bytesPerExpanded:.1f}, "
+                f"counts={self.counts}, sizes={self.sizes})")
@@ -1,226 +1,891 @@
+import gc
+import threading
 import time
-from queue import Queue, PriorityQueue
-from typing import Literal, Tuple, Union
+import tracemalloc
+from collections import deque
+from typing import Iterator, Literal, Tuple, Union
 from MCProblem import MCProblem, State, Action, Node
+from MCSearch import ClosedSet, FifoFrontier, HeapFrontier, LifoFrontier, MemoryNode, MemoryOpenList, SearchResult, SearchTree
+from MCCache import SolutionCache
+from MCHooks import MemoryListener, SearchHooks, SearchListener
+
+# names of the algorithms accepted by findSolution
+ALGORITHMS = ['a*', 'gbfs', 'bfs', 'dfs', 'bibfs', 'ida*', 'sma*', 'constructive']
+
+# tracemalloc is global to the process, so only one search is profiled at a time
+profileLock = threading.Lock()
 
 class MCSolution():
-    def __init__(self, groupSize:int = 3, boatCapacity: int = 2, startMargin: Literal['L', 'R'] = 'L'):
-        self.problem = MCProblem(groupSize, boatCapacity, startMargin)
+    ''' Class that solves the problem with the search algorithms.
+        solve and findSolution are re-entrant: each call runs the search in a new context, with its own
+        per-search state, that shares the problem, its state graph, its shared states and its neighbors cache.
+        So a single warm MCSolution, or MCProblem, can serve concurrent calls from a pool of threads.
+        runAlgorithm and the algorithms themselves use the state of the instance they are called on. '''
+    def __init__(self, groupSize:int = 3, boatCapacity: int = 2, startMargin: Literal['L', 'R'] = 'L', patternDatabase: bool = False, 
+                 solutionCache: SolutionCache | None = None, cachePolicy: Literal['unbounded', 'lru', 'disabled'] = 'unbounded', 
+                 cacheSize: int = 0):
+        self.problem = MCProblem(groupSize, boatCapacity, startMargin, patternDatabase, cachePolicy, cacheSize)
+        self.solutionCache = solutionCache
+        self.hooks: SearchHooks | None = None
+        self.clearSearch()
+
+    @classmethod
+    def fromProblem(cls, problem: MCProblem, solutionCache: SolutionCache | None = None) -> 'MCSolution':
+        ''' Returns a solution for an existing problem, sharing its state graph and its caches '''
+        solution = cls.__new__(cls)
+        solution.problem = problem
+        solution.solutionCache = solutionCache
+        solution.hooks = None
+        solution.clearSearch()
+        return solution
+
+    def context(self, problem: MCProblem | None = None) -> 'MCSolution':
+        ''' Returns the context of a single search: a solution that shares the problem, or runs on the
+            given one, the solution cache and the listeners, with its own per-search state '''
+        context = MCSolution.fromProblem(problem or self.problem, self.solutionCache)
+        if self.hooks is not None:
+            context.hooks = SearchHooks()
+            context.hooks.listeners = list(self.hooks.listeners)
+        return context
+
+    def clearSearch(self) -> None:
+        ''' Resets the per-search state: the path, the reached sets, the search tree and the counters.
+            The searches without a reached set count their repeated states in duplicates, and the searches that
+            build the path themselves add the time spent building it to pathNs, so it is reported as reconstruction '''
         self.path: list[Tuple[State, Union[Action, None]]] = []
-        self.reached: list[str] = []
+        self.reached: ClosedSet[int] = ClosedSet()
+        self.reachedBackward: ClosedSet[int] = ClosedSet()
+        self.tree: SearchTree | None = None
+        self.maxFrontier = 0
+        self.expanded = 0
+        self.generated = 0
+        self.duplicates = 0
+        self.pathNs = 0
 
-    def findSolution(self, alghoritm: str, show: bool = False) -> None:
-        self.path = []
-        self.reached = []
-        self.problem.reset()
+    def addListener(self, listener: SearchListener) -> None:
+        ''' Attaches the listener to the search events of the next runs.
+            The listeners are shared by the concurrent searches, so they must be thread safe to be used by them '''
+        if self.hooks is None:
+            self.hooks = SearchHooks()
+        self.hooks.listeners.append(listener)
 
-        match alghoritm.lower():
-            case "dfs":
-                start = time.time()
-                if self.dfs(self.problem.initialState):
-                    print(f"\n\n{alghoritm.upper()} - {len(self.path)} passos - {(time.time() - start) * 10**3} ms - {len(self.reached)} estados analisados")
-                    if show:
-                        path = self.path.copy()
-                        path.reverse()
-                        self.problem.showSolution(path)
-                else:
-                    print(f"\n\nNão foi possível resolver o problema - usando {alghoritm.upper()}")
-        
-            case "bfs":
-                start = time.time()
-                solution = self.bfs()
-                if solution:
-                    path = self.mountPath(solution, [])
-                    print(f"\n\n{alghoritm.upper()} - {len(path)} passos - {(time.time() - start) * 10**3} ms - {len(self.reached)} estados analisados")
-                    if show:
-                        path.reverse()
-                        self.problem.showSolution(path)
+    def removeListener(self, listener: SearchListener) -> None:
+        ''' Detaches the listener, and disables the events when no listener is left '''
+        if self.hooks is None: return
+        self.hooks.listeners.remove(listener)
+        if not self.hooks.listeners:
+            self.hooks = None
 
-                else:
-                    print(f"\n\nNão foi possível resolver o problema - usando {alghoritm.upper()}")
+    def findSolution(self, alghoritm: str, show: bool = False, nodeBudget: int = 100000, verbose: bool = True, 
+                     profileMemory: bool = False) -> SearchResult:
+        ''' Solves the problem with the algorithm and returns the SearchResult.
+            With verbose, the summary line of the result is printed, and with show, the solution path too.
+            With profileMemory, the search runs under tracemalloc and the result has its MemoryProfile '''
 
-            case "gbfs":
-                start = time.time()
-                solution = self.gbfs()
-                if solution:
-                    path = self.mountPath(solution, [])
-                    print(f"\n\n{alghoritm.upper()} - {len(path)} passos - {(time.time() - start) * 10**3} ms - {len(self.reached)} estados analisados")
-                    if show:
-                        path.reverse()
-                        self.problem.showSolution(path)
+        result = self.profileMemory(alghoritm, nodeBudget) if profileMemory else self.solve(alghoritm, nodeBudget)
+        if verbose:
+            print(f"\n\n{result.describe()}")
+            if result.memory is not None:
+                print(result.memory.describe())
+        if show and result.found:
+            self.problem.showSolution(result.path)
+        return result
 
-                else:
-                    print(f"\n\nNão foi possível resolver o problema - usando {alghoritm.upper()}")
-                
+    def solve(self, alghoritm: str, nodeBudget: int = 100000) -> SearchResult:
+        ''' Returns the SearchResult of the algorithm, from the solution cache when it has the configuration.
+            The search runs in a new context, so concurrent calls don't share any per-search state.
+            self.path is set to the path of the call that finished last. '''
+        name = self.checkAlgorithm(alghoritm)
+
+        # Skip the search when the configuration has no solution at all
+        if not self.problem.isSolvable():
+            self.path = []
+            return SearchResult(name, solvable=False)
+
+        # Reuse the solution stored by a previous run with the same configuration
+        if self.solutionCache is not None:
+            cached = self.solutionCache.get(self.problem, name, nodeBudget)
+            if cached is not None:
+                self.path = cached.path
+                return cached
+
+        result = self.context().runAlgorithm(name, nodeBudget)
+        if result.found and self.solutionCache is not None:
+            self.solutionCache.put(self.problem, name, result, nodeBudget)
+        self.path = result.path
+        return result
+
+    def profileMemory(self, alghoritm: str, nodeBudget: int = 100000, interval: int = 1000) -> SearchResult:
+        ''' Runs the algorithm under tracemalloc, without the solution cache, and returns the SearchResult
+            with the MemoryProfile of the search. The state graph is built before the measure starts,
+            since it is shared by all the algorithms. The tracing makes the search several times slower.
+            The search runs on a copy of the problem with a cold neighbors cache and no shared states, so every
+            profile starts from the same point, whatever ran before, and the caches of the other searches are kept. tracemalloc measures the whole process, so the profiled searches
+            run one at a time and the searches of other threads running at the same time are included in the measure. '''
+        name = self.checkAlgorithm(alghoritm)
+        if not self.problem.isSolvable():
+            self.path = []
+            return SearchResult(name, solvable=False)
+
+        with profileLock:
+            self.path = []
+            self.tree = None
+            problem = self.problem.withColdCache()
+            # free the search trees of the previous runs, so they are not counted in the census
+            gc.collect()
+            tracing = tracemalloc.is_tracing()
+            if not tracing:
+                tracemalloc.start()
+            context = self.context(problem)
+            context.addListener(MemoryListener(problem, interval))
+            try:
+                result = context.runAlgorithm(name, nodeBudget)
+            finally:
+                if not tracing:
+                    tracemalloc.stop()
+        self.path = result.path
+        return result
+
+    @staticmethod
+    def checkAlgorithm(alghoritm: str) -> str:
+        ''' Returns the lower case name of the algorithm, raising ValueError when it is not in ALGORITHMS '''
+        name = alghoritm.lower()
+        if name not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm: {alghoritm}")
+        return name
+
+    def runAlgorithm(self, name: str, nodeBudget: int = 100000) -> SearchResult:
+        ''' Runs the algorithm, sets self.path with the solution and returns the SearchResult.
+            The search uses the state of this instance, so it must not be called by two threads at the same time '''
+
+        self.clearSearch()
+        solution: Node | None = None
+        solutionRow: int | None = None
+        found = False
+
+        start = time.perf_counter_ns()
+        match name:
+            case "dfs":
+                found = self.dfs(self.problem.initialState)
+            case "bibfs":
+                found = self.bidirectionalBfs()
+            case "ida*":
+                found = self.idaStar()
+            case "constructive":
+                found = self.constructive()
+            case "bfs":
+                solutionRow = self.bfs()
+            case "gbfs":
+                solutionRow = self.gbfs()
             case "a*":
-                start = time.time()
-                solution = self.aStar()
-                if solution:
-                    path = self.mountPath(solution, [])
-                    print(f"\n\n{alghoritm.upper()} - {len(path)} passos - {(time.time() - start) * 10**3} ms - {len(self.reached)} estados analisados")
-                    if show:
-                        path.reverse()
-                        self.problem.showSolution(path)
+                solutionRow = self.aStar()
+            case "sma*":
+                solution = self.smaStar(nodeBudget)
+            case _:
+                raise ValueError(f"Unknown algorithm: {name}")
+        searchNs = time.perf_counter_ns() - start - self.pathNs
 
-                else:
-                    print(f"\n\nNão foi possível resolver o problema - usando {alghoritm.upper()}")
+        # The tree searches return the goal node, or the goal row of the search tree, and the path is reconstructed from it
+        start = time.perf_counter_ns()
+        if solution is not None:
+            self.path = self.mountPath(solution)
+            found = True
+        elif solutionRow is not None:
+            self.path = self.mountTreePath(solutionRow)
+            found = True
+        pathNs = time.perf_counter_ns() - start + self.pathNs
+
+        result = SearchResult(name, found, self.path, analysed=self.analysedStates(name) if found else 0, 
+                              expanded=self.expanded, generated=self.generated, 
+                              duplicates=self.reached.duplicates + self.reachedBackward.duplicates + self.duplicates,
+                              maxFrontier=self.maxFrontier, searchNs=searchNs, pathNs=pathNs)
+        if self.hooks is not None:
+            if found: self.hooks.goal(self.problem.goalState, len(self.path))
+            self.hooks.finish(result)
+        return result
+
+    def analysedStates(self, name: str) -> int:
+        ''' Returns the number of states analysed by the last run of the algorithm.
+            The A* family counts the expanded nodes, the other algorithms count the reached states '''
+        if name in ("a*", "ida*", "sma*"):
+            return self.expanded
+        return len(self.reached) + len(self.reachedBackward)
     
-    def mountPath(self, solution: Node, path: list[Tuple[State, Union[Action, None]]]) -> list[Tuple[State, Union[Action, None]]]:
-        if (solution.parent is not None):
-            path.append((solution.parent.state, solution.action))
-            return self.mountPath(solution.parent, path)
-            
+    def mountPath(self, solution: Node) -> list[Tuple[State, Union[Action, None]]]:
+        ''' Returns the path from the root node to the solution node, in order.
+            The parent chain is walked iteratively, so the path length is not bounded by the recursion limit '''
+
+        # Count the steps first, so the path can be written in order from the end
+        length = 0
+        node = solution
+        while node.parent is not None:
+            length += 1
+            node = node.parent
+
+        path: list[Tuple[State, Union[Action, None]]] = [None] * length # type: ignore
+        node = solution
+        while node.parent is not None:
+            length -= 1
+            path[length] = (node.parent.state, node.action)
+            node = node.parent
+
         return path
 
-    def aStar(self) -> Node | None:
-        ''' A* (A Star) algorithm'''
+    def mountTreePath(self, row: int) -> list[Tuple[State, Union[Action, None]]]:
+        ''' Returns the path from the root to the row of the search tree of the last BFS, GBFS or A* '''
+        assert self.tree is not None
+        return self.tree.path(self.problem, row)
+
+    def constructive(self, baseSize: int = 0) -> bool:
+        ''' Constructive solver for large group sizes, with boatCapacity >= 4.
+            The optimal plans repeat a regular ferry round trip in the middle: p = boatCapacity // 2 pairs
+            cross and 1 pair comes back, so each round trip moves p - 1 pairs in 2 steps.
+            A small instance, with the same group size modulo p - 1, is solved by BFS and the round trips
+            are inserted in its path at a state with the same number of missionaires and cannibals.
+            The path is built in time linear in its length and every step is checked with validateAction.
+            Falls back to BFS when the group size is small or no valid plan is found. '''
+
+        groupSize = self.problem.groupSize
+        boatCapacity = self.problem.boatCapacity
+        pairs = boatCapacity // 2
+        step = pairs - 1
+        baseSize = baseSize or 2 * boatCapacity
+
+        if boatCapacity < 4 or groupSize <= baseSize + step:
+            row = self.bfs()
+            start = time.perf_counter_ns()
+            self.path = self.mountTreePath(row) if row is not None else []
+            self.pathNs += time.perf_counter_ns() - start
+            return row is not None
 
-        # Create the root node
-        node = Node(state=self.problem.initialState)
-        # Check if the root node is the goal
-        if node.state == self.problem.goalState: return node
+        initialBoat = self.problem.initialState.boat
+        forward: Literal['L', 'R'] = 'R' if initialBoat == 'L' else 'L'
+        moves = {(action.miss, action.cann, action.direction): action for action in self.problem.moveList}
+        goAction = moves[(pairs, pairs, forward)]
+        backAction = moves[(1, 1, initialBoat)]
 
-        # Create the frontier queue and add the root node
-        frontier: PriorityQueue[Node] = PriorityQueue()
-        frontier.put(node)
+        # Try a few base sizes, in case the head or the tail of a base path don't scale
+        for base in range(baseSize + (groupSize - baseSize) % step, baseSize + 4 * step, step):
+            baseSolution = MCSolution(base, boatCapacity, initialBoat)
+            row = baseSolution.bfs()
+            if row is None: continue
+            basePath = baseSolution.mountTreePath(row)
+            self.reached = baseSolution.reached
+            self.expanded = baseSolution.expanded
+            self.generated = baseSolution.generated
+            self.maxFrontier = baseSolution.maxFrontier
 
-        # Add the root node to the reached list
-        self.reached.append(repr(node.state))
+            # find a state with as many missionaires as cannibals, from where the base path takes a round trip
+            insertAt = -1
+            for i in range(len(basePath) - 1):
+                state, action = basePath[i]
+                nextAction = basePath[i+1][1]
+                assert action is not None and nextAction is not None
+                if (state.miss == state.cann and state.boat == initialBoat 
+                        and (action.miss, action.cann) == (pairs, pairs) and (nextAction.miss, nextAction.cann) == (1, 1)):
+                    insertAt = i
+                    break
+            if insertAt < 0: continue
+
+            # the head keeps the people already on the opposite margin, the tail keeps the people still on the initial one
+            pathStart = time.perf_counter_ns()
+            extra = groupSize - base
+            path: list[Tuple[State, Union[Action, None]]] = []
+            stateId = self.problem.stateId
+            for state, action in basePath[:insertAt]:
+                assert action is not None
+                miss, cann = state.miss + extra, state.cann + extra
+                path.append((State(miss, cann, state.boat, id=stateId(miss, cann, state.boat)), 
+                             moves[(action.miss, action.cann, action.direction)]))
+            # the round trips are built in one pass, with the ids of stateId computed inline:
+            # the state (people, people, side) has the id people * (groupSize + 2) * 2 + side
+            start = basePath[insertAt][0].miss + extra
+            width = (groupSize + 2) * 2
+            goSide, backSide = int(initialBoat == 'R'), int(forward == 'R')
+            for people in range(start, start - (extra // step) * step, -step):
+                path.append((State(people, people, initialBoat, id=people * width + goSide), goAction))
+                path.append((State(people - pairs, people - pairs, forward, id=(people - pairs) * width + backSide), backAction))
+            for state, action in basePath[insertAt:]:
+                assert action is not None
+                path.append((State(state.miss, state.cann, state.boat, id=stateId(state.miss, state.cann, state.boat)), 
+                             moves[(action.miss, action.cann, action.direction)]))
+            self.pathNs += time.perf_counter_ns() - pathStart
+
+            if self.validatePath(path):
+                self.path = path
+                return True
+
+        row = self.bfs()
+        start = time.perf_counter_ns()
+        self.path = self.mountTreePath(row) if row is not None else []
+        self.pathNs += time.perf_counter_ns() - start
+        return row is not None
+
+    def validatePath(self, path: list[Tuple[State, Union[Action, None]]]) -> bool:
+        ''' Returns true if the path goes from the initial state to the goal state, with valid actions only.
+            The walk keeps the expected state as plain integers, applying each action as transitionModel does,
+            so no State is created: each state of the path is checked against it, and then its action with validateAction '''
+        problem = self.problem
+        initialBoat = problem.initialState.boat
+        miss, cann, boat = problem.initialState.miss, problem.initialState.cann, initialBoat
+        for pathState, action in path:
+            if action is None or pathState.miss != miss or pathState.cann != cann or pathState.boat != boat:
+                return False
+            if not problem.validateAction(pathState, action):
+                return False
+            if action.direction != initialBoat:
+                miss -= action.miss
+                cann -= action.cann
+            else:
+                miss += action.miss
+                cann += action.cann
+            boat = action.direction
+
+        goal = problem.goalState
+        return miss == goal.miss and cann == goal.cann and boat == goal.boat
+
+    def aStar(self) -> int | None:
+        ''' A* (A Star) algorithm
+            The nodes are ordered by f = g + h, where g is the path cost and h the heuristic.
+            The reached set holds the expanded states and the goal is checked when a node is expanded.
+            The best g of each state is kept in the search tree, so worse paths are pruned as duplicates,
+            older frontier entries are skipped, and an expanded state is reopened if a cheaper path to it is found.
+            The frontier holds graph rows, and the search tree is kept in self.tree. Returns the goal row. '''
+
+        problem = self.problem
+        problem.buildGraph()
+        graphIds, offsets, targets, edgeMoves = problem.graphIds, problem.graphOffsets, problem.graphTargets, problem.graphMoves
+        moveList, states, internState = problem.moveList, problem.states, problem.internState
+        tree = self.tree = SearchTree(len(graphIds), problem.moveTypecode)
+        parents, moves, costs = tree.parents, tree.moves, tree.costs
+
+        # Add the root row to the frontier
+        root = problem.graphIndex[problem.initialState.id]
+        goal = problem.graphIndex.get(problem.goalState.id, -1)
+        costs[root] = 0.00
+        frontier: HeapFrontier[int] = HeapFrontier()
+        frontier.push(root, problem.calculateHeuristic(problem.initialState))
+        hooks = self.hooks
 
         # While the frontier is not empty
-        while not frontier.empty():
-            # Get the first node from the frontier
-            node = frontier.get()
-            # Get the neighbors of the node
-            neighbors = self.problem.getNeighbors(node.state)
-            
+        while frontier:
+            # Get the row with the lowest f from the frontier
+            row = frontier.pop()
+            # Skip the row if it was already expanded, the entries of its cheaper paths are popped first
+            if graphIds[row] in self.reached: continue
+
+            # Check if the row is the goal
+            if row == goal:
+                self.maxFrontier = frontier.maxSize
+                return row
+
+            # Add the row to the reached set, as an expanded state
+            self.reached.add(graphIds[row])
+            self.expanded += 1
+            cost = costs[row]
+            if hooks is not None: hooks.expand(internState(graphIds[row]), int(cost), len(frontier))
+
             # For each neighbor
-            for neighbor in neighbors:
-                neighborAction = neighbor[1]
-                neighborState = neighbor[0]
-                # Calculate the neighbor cost
-                neighborCost = node.cost + neighborAction.cost + neighborState.heuristic
-                # Create a child node
-                neighborNode = Node(parent=node, action=neighborAction, state=neighborState, cost=neighborCost)                
-                # Check if the child node is the goal
-                if neighborState == self.problem.goalState: return neighborNode
-                
-                # Check if the child node was already reached
-                neighborKeyState = repr(neighborState)
-                if neighborKeyState not in self.reached:
-                    # Add the child node to the frontier
-                    self.reached.append(neighborKeyState)
-                    # Set the neighbor node priority
-                    neighborNode.priority = neighborCost
-                    # Add the child node to the frontier
-                    frontier.put(neighborNode)
+            for edge in range(offsets[row], offsets[row+1]):
+                target, move = targets[edge], edgeMoves[edge]
+                self.generated += 1
+                # Calculate the neighbor path cost
+                neighborCost = cost + moveList[move].cost
+                if hooks is not None: hooks.generate(internState(graphIds[target]), int(neighborCost))
+                # Prune the neighbor if its state was already reached with a path as cheap
+                knownCost = costs[target]
+                if knownCost <= neighborCost:
+                    self.reached.duplicates += 1
+                    if hooks is not None: hooks.duplicate(internState(graphIds[target]), int(neighborCost))
+                    continue
 
+                # Reopen the state if it was already expanded through a more expensive path
+                if knownCost != float('inf'): self.reached.discard(graphIds[target])
+                parents[target], moves[target], costs[target] = row, move, neighborCost
+                # Add the neighbor to the frontier, with the priority f = g + h, preferring the deepest row when f is tied
+                id = graphIds[target]
+                neighborState = states.get(id) or internState(id)
+                frontier.push(target, neighborCost + neighborState.heuristic, -neighborCost)
+
+        self.maxFrontier = frontier.maxSize
         return None
     
-    def gbfs(self) -> Node | None:
-        ''' GBFS (Greedy Best First Search - Busca Gulosa) algorithm'''
-        # Create the root node
-        node = Node(state=self.problem.initialState)
-        # Check if the root node is the goal
-        if node.state == self.problem.goalState: return node
+    def idaStar(self) -> bool:
+        ''' IDA* (Iterative Deepening A*) algorithm
+            Runs depth first searches bounded by f = g + h, raising the bound to the lowest f
+            that exceeded it in the previous iteration. Besides the current branch, each iteration keeps a
+            transposition table with the lowest g of every state it explored: a state reached again without
+            a lower g is pruned, since its subtree was already searched with the same bound.
+            The neighbors are generated lazily and not cached, so the memory only grows with the table. '''
+
+        initialState = self.problem.initialState
+        goalId = self.problem.goalState.id
+        # Check if the initial state is the goal
+        if initialState.id == goalId:
+            self.path = []
+            return True
+
+        bound = self.problem.calculateHeuristic(initialState)
+        generateNeighbors = self.problem.generateNeighbors
+        hooks = self.hooks
+        while True:
+            # The branch keeps the states, their g values, their remaining neighbors and the actions between them
+            states: list[State] = [initialState]
+            costs = [0.00]
+            pending = [generateNeighbors(initialState)]
+            actions: list[Action] = []
+            # The lowest g of each state explored in this iteration, the states of the branch included
+            lowest = {initialState.id: 0.00}
+            nextBound = float('inf')
+            self.expanded += 1
+            if hooks is not None: hooks.expand(initialState, 0, 1)
+
+            while states:
+                for neighborState, neighborAction in pending[-1]:
+                    self.generated += 1
+                    if hooks is not None: hooks.generate(neighborState, len(states))
+                    # Prune the states already explored in this iteration with a lower or equal g
+                    neighborCost = costs[-1] + neighborAction.cost
+                    if neighborCost >= lowest.get(neighborState.id, float('inf')):
+                        self.duplicates += 1
+                        if hooks is not None: hooks.duplicate(neighborState, len(states))
+                        continue
+
+                    # Prune the neighbor when f is over the bound, keeping the lowest pruned f as the next bound
+                    neighborF = neighborCost + neighborState.heuristic
+                    if neighborF > bound:
+                        if neighborF < nextBound: nextBound = neighborF
+                        continue
+
+                    # Check if the neighbor is the goal
+                    if neighborState.id == goalId:
+                        start = time.perf_counter_ns()
+                        actions.append(neighborAction)
+                        self.path = list(zip(states, actions))
+                        self.pathNs += time.perf_counter_ns() - start
+                        return True
+
+                    # Go deeper in the branch
+                    lowest[neighborState.id] = neighborCost
+                    self.expanded += 1
+                    actions.append(neighborAction)
+                    states.append(neighborState)
+                    costs.append(neighborCost)
+                    pending.append(generateNeighbors(neighborState))
+                    if len(states) > self.maxFrontier: self.maxFrontier = len(states)
+                    if hooks is not None: hooks.expand(neighborState, len(states) - 1, len(states))
+                    break
+                else:
+                    # All the neighbors were visited, so backtrack to the parent state
+                    states.pop()
+                    costs.pop()
+                    pending.pop()
+                    if actions: actions.pop()
+
+            # No state was pruned, so there is no solution at all
+            if nextBound == float('inf'):
+                return False
+            bound = nextBound
+
+    def smaStar(self, nodeBudget: int) -> Node | None:
+        ''' SMA* (Simplified Memory-Bounded A*) algorithm
+            Works like A* while there are at most nodeBudget nodes in memory. When the budget is exceeded,
+            the shallowest leaf with the highest f is forgotten, and its f value is kept by the parent,
+            which goes back to the open list to regenerate it later if it becomes the best option.
+            The node with the lowest g of each state in memory is kept by state id: a successor whose state
+            is already in memory with a lower or equal g is dropped, and a leaf reached again with a lower g
+            is replaced, so with a budget larger than the state space it expands each state about once, like A*.
+            Returns None when there is no solution that fits in the budget. '''
+
+        if nodeBudget < 2:
+            raise ValueError("The node budget has to be greater than 1")
+
+        goalId = self.problem.goalState.id
+        root = MemoryNode(state=self.problem.initialState)
+        root.priority = self.problem.calculateHeuristic(root.state)
+        openNodes = MemoryOpenList()
+        inMemory: dict[int, MemoryNode] = {root.state.id: root}
+        self.openNode(root, 1, inMemory)
+        openNodes.add(root)
+        used = 1
+
+        while True:
+            # Get the deepest node with the lowest f value
+            best = openNodes.best()
+            if best is None or best.priority == float('inf'):
+                return None
+            # Check if the node is the goal
+            if best.state.id == goalId:
+                return best
+
+            # Generate the next successor of the node, restoring its f value if it was forgotten
+            index = best.pending.popleft()
+            forgotten = best.forgotten.pop(index, None)
+            neighborState, neighborAction = best.neighbors[index]
+            cost = best.cost + neighborAction.cost
+            existing = inMemory.get(neighborState.id)
+            if existing is not None and existing.cost <= cost:
+                # the state is already in memory with a path at least as cheap
+                self.duplicates += 1
+                if self.hooks is not None: self.hooks.duplicate(neighborState, best.depth + 1)
+                # a node without children stays in the open list, as a leaf that can be forgotten
+                if not best.pending and best.children:
+                    openNodes.discard(best)
+                self.backupNode(best, openNodes)
+                continue
+
+            child = MemoryNode(neighborState, best, neighborAction, cost, best.depth + 1, index)
+            if forgotten is not None:
+                child.priority = forgotten
+            elif neighborState.id != goalId and child.depth >= nodeBudget - 1:
+                # the path to the goal through the child doesn't fit in memory
+                child.priority = float('inf')
+            else:
+                child.priority = max(best.priority, child.cost + neighborState.heuristic)
+            inMemory[neighborState.id] = child
+            self.openNode(child, len(openNodes), inMemory)
+            best.children.append(child)
+
+            # When all the successors are in memory, the node leaves the open list
+            if not best.pending:
+                openNodes.discard(best)
+            self.backupNode(best, openNodes)
+
+            openNodes.add(child)
+            used += 1
+            if len(openNodes) > self.maxFrontier: self.maxFrontier = len(openNodes)
+
+            # A leaf with the same state and a higher g is dominated by the child, so it is removed
+            # without being remembered by its parent. Nodes with children stay until they are forgotten
+            if existing is not None and not existing.children:
+                self.removeLeaf(existing, openNodes, inMemory, remember=False)
+                used -= 1
+
+            if used > nodeBudget:
+                # Forget the shallowest leaf with the highest f value
+                worst = openNodes.worstLeaf()
+                assert worst is not None
+                self.removeLeaf(worst, openNodes, inMemory, remember=True)
+                used -= 1
+
+    def removeLeaf(self, leaf: MemoryNode, openNodes: MemoryOpenList, inMemory: dict[int, MemoryNode], remember: bool) -> None:
+        ''' Removes the SMA* leaf from memory. With remember, the parent keeps the f value of the leaf
+            to regenerate it later, unless it can never reach the goal. The parent goes back to the open list
+            when it has successors to regenerate, or no children left, so it can be forgotten too '''
+        openNodes.discard(leaf)
+        if inMemory.get(leaf.state.id) is leaf:
+            del inMemory[leaf.state.id]
+        parent = leaf.parent
+        assert isinstance(parent, MemoryNode)
+        parent.children.remove(leaf)
+        if remember and leaf.priority != float('inf'):
+            parent.pending.append(leaf.index)
+            parent.forgotten[leaf.index] = leaf.priority
+        self.backupNode(parent, openNodes)
+        if parent.pending or not parent.children:
+            openNodes.add(parent)
+
+    def openNode(self, node: MemoryNode, frontierSize: int, inMemory: dict[int, MemoryNode]) -> None:
+        ''' Generates the neighbors of the SMA* node, keeping as pending the ones whose state isn't in memory
+            with a lower or equal g, which includes the states of its branch.
+            The neighbors are generated without the neighbors cache, so they only take memory while the node is kept '''
+        self.expanded += 1
+        node.neighbors = list(self.problem.generateNeighbors(node.state))
+        self.generated += len(node.neighbors)
+        if self.hooks is not None: self.hooks.expand(node.state, node.depth, frontierSize, node.neighbors)
+        pending: deque[int] = deque()
+        for i, (neighborState, neighborAction) in enumerate(node.neighbors):
+            existing = inMemory.get(neighborState.id)
+            if existing is None or existing.cost > node.cost + neighborAction.cost:
+                pending.append(i)
+            else:
+                self.duplicates += 1
+                if self.hooks is not None: self.hooks.duplicate(neighborState, node.depth + 1)
+        node.pending = pending
+        if not node.pending:
+            # a dead end can never reach the goal
+            node.priority = float('inf') if node.state.id != self.problem.goalState.id else node.priority
+
+    def backupNode(self, node: MemoryNode, openNodes: MemoryOpenList) -> None:
+        ''' Updates the f value of the SMA* node, once all its successors were generated, to the lowest
+            f value of its children and forgotten children, and propagates it to the ancestors.
+            A node without any successor left can never reach the goal, so its f value is infinite.
+            The open nodes whose f value changed are moved in the open list '''
+        current: Node | None = node
+        while isinstance(current, MemoryNode) and len(current.pending) == len(current.forgotten):
+            values = [child.priority for child in current.children] + list(current.forgotten.values())
+            lowest = min(values) if values else float('inf')
+            if lowest == current.priority: break
+            current.priority = lowest
+            if current in openNodes:
+                openNodes.add(current)
+            current = current.parent
+
+    def gbfs(self) -> int | None:
+        ''' GBFS (Greedy Best First Search - Busca Gulosa) algorithm
+            The frontier holds graph rows, and the search tree is kept in self.tree. Returns the goal row. '''
+        problem = self.problem
+        problem.buildGraph()
+        graphIds, offsets, targets, edgeMoves = problem.graphIds, problem.graphOffsets, problem.graphTargets, problem.graphMoves
+        moveList, states, internState = problem.moveList, problem.states, problem.internState
+        tree = self.tree = SearchTree(len(graphIds), problem.moveTypecode)
+        parents, moves, costs = tree.parents, tree.moves, tree.costs
+
+        # Get the root row
+        root = problem.graphIndex[problem.initialState.id]
+        goal = problem.graphIndex.get(problem.goalState.id, -1)
+        costs[root] = 0.00
+        # Check if the root row is the goal
+        if root == goal: return root
         
-        # Create the frontier queue and add the root node
-        frontier: PriorityQueue[Node] = PriorityQueue()
-        frontier.put(node)
+        # Create the frontier queue and add the root row
+        frontier: HeapFrontier[int] = HeapFrontier()
+        frontier.push(root)
 
-        # Add the root node to the reached list
-        self.reached.append(repr(node.state))
+        # Add the root row to the reached set
+        self.reached.add(graphIds[root])
+        hooks = self.hooks
 
         # While the frontier is not empty
-        while not frontier.empty():
-            # Get the first node from the frontier
-            node = frontier.get()
-            # Get the neighbors of the node
-            neighbors = self.problem.getNeighbors(node.state)
+        while frontier:
+            # Get the first row from the frontier
+            row = frontier.pop()
+            self.expanded += 1
+            cost = costs[row]
+            if hooks is not None: hooks.expand(internState(graphIds[row]), int(cost), len(frontier))
             
             # For each neighbor
-            for neighbor in neighbors:
-                neighborAction = neighbor[1]
-                neighborState = neighbor[0]
-                # Create a child node
-                childNode = Node(parent=node, action=neighborAction, state=neighborState)
-                # Check if the child node is the goal
-                if neighborState == self.problem.goalState: return childNode
+            for edge in range(offsets[row], offsets[row+1]):
+                target, move = targets[edge], edgeMoves[edge]
+                self.generated += 1
+                if hooks is not None: hooks.generate(internState(graphIds[target]), int(cost) + 1)
+                # Check if the neighbor is the goal
+                if target == goal:
+                    parents[target], moves[target], costs[target] = row, move, cost + moveList[move].cost
+                    self.maxFrontier = frontier.maxSize
+                    return target
                 
-                # Check if the child node was already reached
-                childKeyState = repr(childNode.state)
-                if childKeyState not in self.reached:
-                    # Add the child node to the reached list
-                    self.reached.append(childKeyState)
-                    # Set the child node priority, which is the heuristic value
-                    childNode.priority = neighborState.heuristic
-                    # Add the child node to the frontier
-                    frontier.put(childNode)
+                # Check if the neighbor was already reached
+                # (the reached set stores the neighbor when it is new)
+                id = graphIds[target]
+                if self.reached.add(id):
+                    parents[target], moves[target], costs[target] = row, move, cost + moveList[move].cost
+                    # Add the neighbor to the frontier, with the heuristic value as priority
+                    neighborState = states.get(id) or internState(id)
+                    frontier.push(target, neighborState.heuristic)
+                elif hooks is not None:
+                    hooks.duplicate(internState(id), int(cost) + 1)
 
+        self.maxFrontier = frontier.maxSize
         return None
 
-    def bfs(self) -> Node | None:
-        ''' BFS (Breadth First Search - Busca em Largura) algorithm'''
-        # Create the root node
-        node = Node(state=self.problem.initialState)
-        # Check if the root node is the goal
-        if node.state == self.problem.goalState: return node
+    def bfs(self) -> int | None:
+        ''' BFS (Breadth First Search - Busca em Largura) algorithm
+            The frontier holds graph rows, and the search tree is kept in self.tree. Returns the goal row. '''
+        problem = self.problem
+        problem.buildGraph()
+        graphIds, offsets, targets, edgeMoves = problem.graphIds, problem.graphOffsets, problem.graphTargets, problem.graphMoves
+        moveList, internState = problem.moveList, problem.internState
+        tree = self.tree = SearchTree(len(graphIds), problem.moveTypecode)
+        parents, moves, costs = tree.parents, tree.moves, tree.costs
+
+        # Get the root row
+        root = problem.graphIndex[problem.initialState.id]
+        goal = problem.graphIndex.get(problem.goalState.id, -1)
+        costs[root] = 0.00
+        # Check if the root row is the goal
+        if root == goal: return root
         
-        # Create the frontier queue and add the root node
-        frontier: Queue[Node] = Queue()
-        frontier.put(node)
+        # Create the frontier queue and add the root row
+        frontier: FifoFrontier[int] = FifoFrontier()
+        frontier.push(root)
 
-        # Add the root node to the reached list
-        self.reached.append(repr(node.state))
+        # Add the root row to the reached set
+        self.reached.add(graphIds[root])
+        hooks = self.hooks
 
         # While the frontier is not empty
-        while not frontier.empty():
-            # Get the first node of the frontier
-            node = frontier.get()
-            # Get the neighbors of the node
-            neighbors = self.problem.getNeighbors(node.state)
+        while frontier:
+            # Get the first row of the frontier
+            row = frontier.pop()
+            self.expanded += 1
+            cost = costs[row]
+            if hooks is not None: hooks.expand(internState(graphIds[row]), int(cost), len(frontier))
             
             # For each neighbor
-            for neighbor in neighbors:
-                # Create a child node
-                childNode = Node(parent=node, action=neighbor[1], state=neighbor[0])
-                # Check if the child node is the goal
-                if neighbor[0] == self.problem.goalState: return childNode
+            for edge in range(offsets[row], offsets[row+1]):
+                target, move = targets[edge], edgeMoves[edge]
+                self.generated += 1
+                if hooks is not None: hooks.generate(internState(graphIds[target]), int(cost) + 1)
+                # Check if the neighbor is the goal
+                if target == goal:
+                    parents[target], moves[target], costs[target] = row, move, cost + moveList[move].cost
+                    self.maxFrontier = frontier.maxSize
+                    return target
                 
-                # Check if the child node was already reached
-                childKeyState = repr(childNode.state)
-                if childKeyState not in self.reached:
-                    # Add the child node to the reached list
-                    self.reached.append(childKeyState)
-                    # Add the child node to the frontier
-                    frontier.put(childNode)
+                # Check if the neighbor was already reached
+                # (the reached set stores the neighbor when it is new)
+                if self.reached.add(graphIds[target]):
+                    parents[target], moves[target], costs[target] = row, move, cost + moveList[move].cost
+                    # Add the neighbor to the frontier
+                    frontier.push(target)
+                elif hooks is not None:
+                    hooks.duplicate(internState(graphIds[target]), int(cost) + 1)
 
+        self.maxFrontier = frontier.maxSize
         return None
 
+    def bidirectionalBfs(self) -> bool:
+        ''' Bidirectional BFS (Busca em Largura Bidirecional) algorithm
+            Searches forward from the initial state and backward from the goal state, one whole level
+            at a time, always expanding the smaller frontier. The moves are reversible, so the backward
+            search uses the same neighbors, and the reverse action is used to walk toward the goal. 
+            When both searches reach the same state, the two half paths are joined in self.path. '''
+
+        initialState = self.problem.initialState
+        goalState = self.problem.goalState
+        # Check if the initial state is the goal
+        if initialState.id == goalState.id:
+            self.path = []
+            return True
+
+        # Each side keeps, for every reached state, the state it came from and the action between them
+        forwardParents: dict[int, Tuple[State, Action]] = {}
+        backwardParents: dict[int, Tuple[State, Action]] = {}
+        self.reached.add(initialState.id)
+        self.reachedBackward.add(goalState.id)
+        forwardFrontier = [initialState]
+        backwardFrontier = [goalState]
+        meeting: State | None = None
+        # the depth of the current level of each side
+        forwardDepth = backwardDepth = 0
+        hooks = self.hooks
+
+        while forwardFrontier and backwardFrontier and meeting is None:
+            self.maxFrontier = max(self.maxFrontier, len(forwardFrontier) + len(backwardFrontier))
+            nextFrontier: list[State] = []
+
+            if len(forwardFrontier) <= len(backwardFrontier):
+                # Expand the forward level
+                for state in forwardFrontier:
+                    self.expanded += 1
+                    if hooks is not None: hooks.expand(state, forwardDepth, len(forwardFrontier) + len(backwardFrontier))
+                    for neighborState, neighborAction in self.problem.iterNeighbors(state):
+                        self.generated += 1
+                        if hooks is not None: hooks.generate(neighborState, forwardDepth + 1)
+                        if self.reached.add(neighborState.id):
+                            forwardParents[neighborState.id] = (state, neighborAction)
+                            nextFrontier.append(neighborState)
+                            # Check if the backward search already reached the neighbor
+                            if neighborState.id in self.reachedBackward:
+                                meeting = neighborState
+                                break
+                        elif hooks is not None:
+                            hooks.duplicate(neighborState, forwardDepth + 1)
+                    if meeting is not None: break
+                forwardFrontier = nextFrontier
+                forwardDepth += 1
+            else:
+                # Expand the backward level, the neighbor goes to the state with the reverse action
+                for state in backwardFrontier:
+                    self.expanded += 1
+                    if hooks is not None: hooks.expand(state, backwardDepth, len(forwardFrontier) + len(backwardFrontier))
+                    for neighborState, neighborAction in self.problem.iterNeighbors(state):
+                        self.generated += 1
+                        if hooks is not None: hooks.generate(neighborState, backwardDepth + 1)
+                        if self.reachedBackward.add(neighborState.id):
+                            backwardParents[neighborState.id] = (state, self.problem.reverseMoves[neighborAction])
+                            nextFrontier.append(neighborState)
+                            # Check if the forward search already reached the neighbor
+                            if neighborState.id in self.reached:
+                                meeting = neighborState
+                                break
+                        elif hooks is not None:
+                            hooks.duplicate(neighborState, backwardDepth + 1)
+                    if meeting is not None: break
+                backwardFrontier = nextFrontier
+                backwardDepth += 1
+
+        if meeting is None:
+            return False
+
+        # The first half goes from the meeting state back to the initial state, so it is reversed
+        start = time.perf_counter_ns()
+        path: list[Tuple[State, Union[Action, None]]] = []
+        key = meeting.id
+        while key != initialState.id:
+            parentState, action = forwardParents[key]
+            path.append((parentState, action))
+            key = parentState.id
+        path.reverse()
+
+        # The second half goes from the meeting state to the goal state
+        state = meeting
+        while state.id != goalState.id:
+            nextState, action = backwardParents[state.id]
+            path.append((state, action))
+            state = nextState
+
+        self.path = path
+        self.pathNs += time.perf_counter_ns() - start
+        return True
+
     def dfs(self, state: State) -> bool:
-        ''' DFS (Depth First Search - Busca em Profundidade) algorithm '''
+        ''' DFS (Depth First Search - Busca em Profundidade) algorithm
+            Uses an explicit stack instead of recursion, so the search depth is not
+            bounded by the Python recursion limit. The neighbors are visited in the same order. '''
 
         # Check if the state is the goal
-        if state == self.problem.goalState: return True
+        if state.id == self.problem.goalState.id:
+            self.path = []
+            return True
 
-        # Check if the state was already reached
-        keyState = repr(state)
-        if keyState in self.reached: return False
-        self.reached.append(keyState)
-        
-        # Get the neighbors of the state
-        neighbors = self.problem.getNeighbors(state)
-        for neighbor in neighbors:
-            neighborAction = neighbor[1]
-            neighborState = neighbor[0]
-            # Recursive checks all the neighbors
-            if self.dfs(neighborState):
-                # If the neighbor is the goal, add the parent state and the action to the path
-                self.path.append((state, neighborAction))
-                return True
-        
-        return False
+        # Add the state to the reached set
+        self.reached.add(state.id)
+
+        # The stack keeps the states of the current branch, the remaining neighbors of each
+        # state and the action taken from each state to the next one in the branch
+        # the neighbors are generated lazily, as the branch goes through them
+        states: list[State] = [state]
+        self.expanded += 1
+        pending: LifoFrontier[Iterator[Tuple[State, Action]]] = LifoFrontier()
+        pending.push(self.problem.iterNeighbors(state))
+        actions: list[Action] = []
+        hooks = self.hooks
+        if hooks is not None: hooks.expand(state, 0, 1)
+
+        while pending:
+            for neighborState, neighborAction in pending.peek():
+                self.generated += 1
+                if hooks is not None: hooks.generate(neighborState, len(states))
+                # Check if the neighbor is the goal
+                if neighborState.id == self.problem.goalState.id:
+                    # The path is the current branch plus the action that reaches the goal
+                    start = time.perf_counter_ns()
+                    actions.append(neighborAction)
+                    self.path = list(zip(states, actions))
+                    self.pathNs += time.perf_counter_ns() - start
+                    self.maxFrontier = pending.maxSize
+                    return True
 
+                # Check if the neighbor was already reached, and go deeper if it was not
+                if self.reached.add(neighborState.id):
+                    actions.append(neighborAction)
+                    states.append(neighborState)
+                    self.expanded += 1
+                    pending.push(self.problem.iterNeighbors(neighborState))
+                    if hooks is not None: hooks.expand(neighborState, len(states) - 1, len(pending))
+                    break
+                elif hooks is not None:
+                    hooks.duplicate(neighborState, len(states))
+            else:
+                # All the neighbors were visited, so backtrack to the parent state
+                states.pop()
+                pending.pop()
+                if actions: actions.pop()
+
+        self.maxFrontier = pending.maxSize
+        return False
 
 def main():
     groupSize = 3
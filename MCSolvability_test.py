@@ -0,0 +1,26 @@
+import unittest
+from MCProblem import MCProblem
+
+class TestSolvability(unittest.TestCase):
+    ''' Checks the constant time rule of isSolvable against the exhaustive walk of goalReachable '''
+
+    def test_isSolvable_matches_goalReachable(self):
+        for groupSize in range(1, 30):
+            for boatCapacity in range(1, 10):
+                for startMargin in ('L', 'R'):
+                    with self.subTest(groupSize=groupSize, boatCapacity=boatCapacity, startMargin=startMargin):
+                        mc = MCProblem(groupSize, boatCapacity, startMargin)
+                        self.assertEqual(mc.isSolvable(), mc.goalReachable())
+
+    def test_isSolvable_matches_goalReachable_python_graph(self):
+        # the pure Python builder only keeps the reachable states, so it is checked on its own
+        for groupSize in range(1, 12):
+            for boatCapacity in range(1, 7):
+                with self.subTest(groupSize=groupSize, boatCapacity=boatCapacity):
+                    mc = MCProblem(groupSize, boatCapacity)
+                    mc.buildGraphPython()
+                    mc.graphBuilt = True
+                    self.assertEqual(mc.isSolvable(), mc.goalReachable())
+
+if __name__ == '__main__':
+    unittest.main()
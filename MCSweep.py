@@ -0,0 +1,165 @@
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import product
+from typing import Any, Iterable, Iterator, Literal, Tuple
+from MCSolution import ALGORITHMS, MCSolution
+
+# columns of the rows written by the sweep, the first 4 identify the configuration
+SWEEP_FIELDS = ['groupSize', 'boatCapacity', 'startMargin', 'algorithm', 'status', 'solvable', 'found', 'steps', 'analysed', 
+                'expanded', 'generated', 'duplicates', 'maxFrontier', 'searchNs', 'pathNs', 'elapsedMs']
+
+Configuration = Tuple[int, int, Literal['L', 'R'], str]
+
+def sweepConfigurations(groupSizes: Iterable[int], boatCapacities: Iterable[int],
+                        startMargins: Iterable[Literal['L', 'R']], algorithms: Iterable[str]) -> Iterator[Configuration]:
+    ''' Returns all the combinations of group size, boat capacity, start margin and algorithm,
+        raising ValueError when an algorithm is not in ALGORITHMS '''
+    names = [MCSolution.checkAlgorithm(algorithm) for algorithm in algorithms]
+    return product(groupSizes, boatCapacities, startMargins, names)
+
+def configurationRow(configuration: Configuration) -> dict[str, Any]:
+    ''' Returns the row of the configuration, without the results '''
+    groupSize, boatCapacity, startMargin, algorithm = configuration
+    return {'groupSize': groupSize, 'boatCapacity': boatCapacity, 'startMargin': startMargin, 'algorithm': algorithm}
+
+def solveConfiguration(configuration: Configuration, connection) -> None:
+    ''' Solves a single configuration, without printing, and sends its row through the connection.
+        Runs in its own process, so it can be stopped when it exceeds the timeout. '''
+    try:
+        groupSize, boatCapacity, startMargin, algorithm = configuration
+        result = MCSolution(groupSize, boatCapacity, startMargin).solve(algorithm)
+        row = configurationRow(configuration)
+        row.update({'status': 'ok' if result.found else 'not found' if result.solvable else 'unsolvable',
+                    'solvable': result.solvable, 'found': result.found})
+        if result.solvable:
+            row.update({'expanded': result.expanded, 'generated': result.generated, 'duplicates': result.duplicates, 
+                        'maxFrontier': result.maxFrontier, 'searchNs': result.searchNs, 'pathNs': result.pathNs, 'elapsedMs': result.elapsedMs})
+        if result.found:
+            row.update({'steps': result.pathLength, 'analysed': result.analysed})
+        connection.send(row)
+    except MemoryError:
+        connection.send(dict(configurationRow(configuration), status='memory'))
+    finally:
+        connection.close()
+
+def runConfiguration(configuration: Configuration, timeout: float | None = None) -> dict[str, Any]:
+    ''' Returns the row of a single configuration, with the status timeout when it doesn't finish within
+        the timeout, in seconds, or error when its process dies without a row. Without a timeout, it waits for the search '''
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(target=solveConfiguration, args=(configuration, sender))
+    process.start()
+    sender.close()
+    try:
+        if receiver.poll(timeout):
+            return receiver.recv()
+        return dict(configurationRow(configuration), status='timeout')
+    except EOFError:
+        # the process died without sending its row, usually killed by the system for using too much memory
+        return dict(configurationRow(configuration), status='error')
+    finally:
+        if process.is_alive():
+            process.terminate()
+        process.join()
+        receiver.close()
+
+def configurationKey(row: dict[str, Any]) -> Configuration:
+    ''' Returns the configuration of a row, read back from a CSV or JSONL file '''
+    return (int(row['groupSize']), int(row['boatCapacity']), row['startMargin'], str(row['algorithm']).lower())
+
+def trimPartialLine(output: str) -> None:
+    ''' Removes the last line of the output file when it was cut in the middle by an interrupted sweep '''
+    with open(output, 'rb+') as file:
+        data = file.read()
+        if data and not data.endswith(b'\n'):
+            file.truncate(data.rfind(b'\n') + 1)
+
+def readDoneConfigurations(output: str) -> set[Configuration]:
+    ''' Returns the configurations already written to the output file, so an interrupted sweep can be resumed.
+        A last line cut in the middle is removed, and its configuration is solved again '''
+
+    done: set[Configuration] = set()
+    if not os.path.exists(output):
+        return done
+    trimPartialLine(output)
+
+    with open(output, newline='') as file:
+        if output.endswith('.jsonl'):
+            for line in file:
+                try:
+                    done.add(configurationKey(json.loads(line)))
+                except (ValueError, KeyError, TypeError):
+                    continue
+        else:
+            for row in csv.DictReader(file):
+                try:
+                    done.add(configurationKey(row))
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    return done
+
+def runSweep(output: str, groupSizes: Iterable[int], boatCapacities: Iterable[int], startMargins: Iterable[Literal['L', 'R']],
+             algorithms: Iterable[str], workers: int | None = None, resume: bool = True, timeout: float | None = None) -> int:
+    ''' Solves every configuration of the sweep, each in its own process, with at most workers processes at a time,
+        writing each row to the output file (CSV, or JSONL when the file name ends with .jsonl) as soon as it is solved.
+        A configuration that doesn't finish within the timeout, in seconds, is stopped and written with the status timeout.
+        With resume, the configurations already in the output file are skipped.
+        The algorithms are checked before any configuration is solved.
+        Returns the number of configurations solved by this call. '''
+
+    done = readDoneConfigurations(output) if resume else set()
+    pending = [configuration for configuration in sweepConfigurations(groupSizes, boatCapacities, startMargins, algorithms)
+               if configuration not in done]
+    if not pending:
+        return 0
+
+    jsonLines = output.endswith('.jsonl')
+    newFile = not resume or not os.path.exists(output) or os.path.getsize(output) == 0
+    # each thread only waits for the process of its configuration
+    with open(output, 'w' if newFile else 'a', newline='') as file, ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        writer = csv.DictWriter(file, fieldnames=SWEEP_FIELDS, restval='')
+        if newFile and not jsonLines:
+            writer.writeheader()
+
+        futures = [executor.submit(runConfiguration, configuration, timeout) for configuration in pending]
+        for future in as_completed(futures):
+            row = future.result()
+            if jsonLines:
+                file.write(json.dumps(row) + '\n')
+            else:
+                writer.writerow(row)
+            file.flush()
+
+    return len(pending)
+
+def parseRange(text: str) -> list[int]:
+    ''' Parses a list of integers, given as "start:stop[:step]" (stop included) or as "a,b,c" '''
+    if ':' in text:
+        parts = [int(part) for part in text.split(':')]
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        return list(range(start, stop + 1, step))
+    return [int(part) for part in text.split(',')]
+
+def main():
+    parser = argparse.ArgumentParser(description="Varredura de configurações do problema dos missionários e canibais")
+    parser.add_argument('--sizes', type=parseRange, required=True, help="tamanhos dos grupos, como 1:100 ou 3,5,10")
+    parser.add_argument('--capacities', type=parseRange, required=True, help="capacidades do barco, como 2:8 ou 2,4")
+    parser.add_argument('--margins', nargs='+', choices=['L', 'R'], default=['L'], help="margens iniciais")
+    parser.add_argument('--algorithms', nargs='+', type=str.lower, choices=ALGORITHMS, default=['a*', 'gbfs', 'bfs', 'dfs'], help="algoritmos")
+    parser.add_argument('--output', required=True, help="arquivo de saída, .csv ou .jsonl")
+    parser.add_argument('--workers', type=int, default=None, help="número de processos")
+    parser.add_argument('--timeout', type=float, default=None, help="tempo máximo por configuração, em segundos")
+    parser.add_argument('--restart', action='store_true', help="ignora o arquivo de saída existente em vez de continuar a varredura")
+    args = parser.parse_args()
+
+    solved = runSweep(args.output, args.sizes, args.capacities, args.margins, args.algorithms, args.workers, resume=not args.restart,
+                      timeout=args.timeout)
+    print(f"{solved} configurações resolvidas - {args.output}")
+
+if __name__ == "__main__":
+    main()